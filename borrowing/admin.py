@@ -1,4 +1,75 @@
 from django.contrib import admin
-from .models import Borrow
+from django.contrib.auth import get_permission_codename
 
-admin.site.register(Borrow)
+from library_management.paginators import EstimatedCountPaginator
+
+from .models import Borrow, DueReminder, IdempotencyKey
+from .summary import invalidate_user_summary
+
+
+@admin.register(Borrow)
+class BorrowAdmin(admin.ModelAdmin):
+    """
+    - User and book (with its author for Book.__str__) are joined in the changelist query
+    - The changelist skips the full table count and estimates the unfiltered total
+    - Read only: borrows are made and returned through the borrowing services
+      (or the bulk action), which keep copies and borrow counts in step
+    - The bulk action needs the change borrow permission
+    """
+
+    list_display = [
+        "borrow_id",
+        "user",
+        "book",
+        "borrow_date",
+        "due_date",
+        "return_date",
+    ]
+    list_select_related = ["user", "book__author"]
+    list_filter = [("return_date", admin.EmptyFieldListFilter)]
+    search_fields = ["user__username", "book__title"]
+    autocomplete_fields = ["user", "book"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["mark_returned"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_return_permission(self, request):
+        # The change form stays read only, so the action checks the permission itself
+        opts = self.opts
+        codename = get_permission_codename("change", opts)
+        return request.user.has_perm(f"{opts.app_label}.{codename}")
+
+    @admin.action(
+        description="Mark selected borrows as returned", permissions=["return"]
+    )
+    def mark_returned(self, request, queryset):
+        user_ids = queryset.mark_returned()
+        invalidate_user_summary(*user_ids)
+        self.message_user(request, f"Returned borrows of {len(user_ids)} users")
+
+
+@admin.register(DueReminder)
+class DueReminderAdmin(admin.ModelAdmin):
+    list_display = ["borrow", "user", "due_date", "created_at", "sent_at"]
+    list_select_related = ["borrow__user", "user"]
+    list_filter = [("sent_at", admin.EmptyFieldListFilter)]
+    search_fields = ["user__username"]
+    raw_id_fields = ["borrow", "user"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ["key", "user", "endpoint", "status_code", "expires_at"]
+    list_select_related = ["user"]
+    search_fields = ["key"]
+    raw_id_fields = ["user"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
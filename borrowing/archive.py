@@ -0,0 +1,83 @@
+import logging
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import Borrow, BorrowArchive
+
+logger = logging.getLogger(__name__)
+
+HISTORY_FIELDS = [
+    "borrow_id",
+    "user_id",
+    "book_id",
+    "borrow_date",
+    "due_date",
+    "return_date",
+]
+
+
+def archive_batch(returned_before, batch_size):
+    """
+    Move one batch of borrows returned before `returned_before` to BorrowArchive
+    - Copy and delete happen in the same transaction, so a crash never loses
+      or duplicates a row and the next run simply continues where this one stopped
+    - Late returns stay until apply_return_penalty has added their points, the
+      task looks the borrow up in the live table
+    Returns the number of archived borrows
+    """
+    with transaction.atomic():
+        borrows = list(
+            Borrow.objects.select_for_update()
+            .filter(return_date__lt=returned_before)
+            .filter(Q(return_date__lte=F("due_date")) | Q(penalty_applied=True))
+            .order_by("return_date")
+            .values(*HISTORY_FIELDS)[:batch_size]
+        )
+        if not borrows:
+            return 0
+
+        BorrowArchive.objects.bulk_create(
+            [BorrowArchive(**borrow) for borrow in borrows], ignore_conflicts=True
+        )
+        Borrow.objects.filter(
+            pk__in=[borrow["borrow_id"] for borrow in borrows]
+        ).delete()
+
+    return len(borrows)
+
+
+def archive_returned_borrows(older_than_days, batch_size=1000, max_batches=None):
+    """
+    Archive borrows returned more than `older_than_days` ago in batches
+    - Yields the size of every archived batch
+    """
+    returned_before = date.today() - timedelta(days=older_than_days)
+    batches = 0
+
+    while max_batches is None or batches < max_batches:
+        try:
+            archived = archive_batch(returned_before, batch_size)
+        except Exception as e:
+            logger.error(f"Error archiving borrows=> {e}", exc_info=True)
+            raise
+
+        if not archived:
+            return
+        batches += 1
+        yield archived
+
+
+def borrow_history(user_id=None):
+    """
+    Live and archived borrows as one queryset of dicts, newest first
+    """
+    live = Borrow.objects.values(*HISTORY_FIELDS)
+    archived = BorrowArchive.objects.values(*HISTORY_FIELDS)
+
+    if user_id is not None:
+        live = live.filter(user_id=user_id)
+        archived = archived.filter(user_id=user_id)
+
+    return live.union(archived, all=True).order_by("-borrow_date", "borrow_id")
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(data):
+    """
+    Hash of the request body so a key can't be reused for a different request
+    """
+    payload = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def claim_key(user, endpoint, key, request_hash):
+    """
+    Return (record, created) for the key
+    - Only one concurrent request can create the row, the others get the existing one
+    - Expired rows and in-progress rows older than the lock timeout are taken over
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+
+    record = IdempotencyKey.objects.filter(
+        user=user, endpoint=endpoint, key=key
+    ).first()
+
+    if record is None:
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    user=user,
+                    endpoint=endpoint,
+                    key=key,
+                    request_hash=request_hash,
+                    created_at=now,
+                    expires_at=expires_at,
+                )
+            return record, True
+        except IntegrityError:
+            record = IdempotencyKey.objects.get(user=user, endpoint=endpoint, key=key)
+
+    stale_before = now - timedelta(seconds=settings.IDEMPOTENCY_LOCK_TIMEOUT)
+    is_expired = record.expires_at <= now
+    is_abandoned = not record.is_completed() and record.created_at <= stale_before
+
+    if is_expired or is_abandoned:
+        taken_over = IdempotencyKey.objects.filter(
+            pk=record.pk, created_at=record.created_at
+        ).update(
+            request_hash=request_hash,
+            status_code=None,
+            response_body=None,
+            created_at=now,
+            expires_at=expires_at,
+        )
+        if taken_over:
+            record.refresh_from_db()
+            return record, True
+
+    return record, False
+
+
+def store_response(record, handler):
+    """
+    Run the handler and store its response on the key in one transaction, so
+    a crash can't leave a borrow or return behind with its key still in
+    progress for another request to take over and run again
+    - 5xx responses roll back whatever the handler wrote
+    - If the key was taken over in the meantime the handler's writes are
+      rolled back too and the request gets 409
+    """
+    try:
+        with transaction.atomic():
+            response = handler()
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+
+            stored = IdempotencyKey.objects.filter(
+                pk=record.pk, created_at=record.created_at, status_code__isnull=True
+            ).update(status_code=response.status_code, response_body=response.data)
+            if not stored:
+                transaction.set_rollback(True)
+                return Response(
+                    {"details": "A request with this idempotency key is in progress"},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return response
+    except Exception as e:
+        logger.error(f"Error storing idempotent response=> {e}", exc_info=True)
+        return Response(
+            {"details": "An error occure while storing idempotent response"},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        )
+
+
+def idempotent(endpoint):
+    """
+    Make a POST handler safe to retry with an Idempotency-Key header
+    - A replay returns the stored response without running the handler again
+    - A duplicate that arrives while the first one is running gets 409
+    - 5xx responses are not stored so the client can retry them
+    - The handler runs inside the transaction that stores its response, so
+      conflicts are not retried in process for requests with a key, the
+      client's retry with the same key runs them again
+    """
+
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view_method(self, request, *args, **kwargs)
+
+            if len(key) > MAX_KEY_LENGTH:
+                return Response(
+                    {
+                        "details": f"Idempotency key can't be longer than {MAX_KEY_LENGTH}"
+                    },
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            request_hash = request_fingerprint(request.data)
+            try:
+                record, created = claim_key(request.user, endpoint, key, request_hash)
+            except Exception as e:
+                logger.error(f"Error claiming idempotency key=> {e}", exc_info=True)
+                return Response(
+                    {"details": "An error occure while checking idempotency key"},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+
+            if not created:
+                if record.request_hash != request_hash:
+                    return Response(
+                        {
+                            "details": "Idempotency key is already used for a different request"
+                        },
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    )
+                if not record.is_completed():
+                    return Response(
+                        {
+                            "details": "A request with this idempotency key is in progress"
+                        },
+                        status=status.HTTP_409_CONFLICT,
+                    )
+                return Response(
+                    record.response_body,
+                    status=record.status_code,
+                    headers={"Idempotent-Replayed": "true"},
+                )
+
+            response = store_response(
+                record, lambda: view_method(self, request, *args, **kwargs)
+            )
+            if response.status_code >= 500:
+                try:
+                    IdempotencyKey.objects.filter(
+                        pk=record.pk, created_at=record.created_at
+                    ).delete()
+                except Exception as e:
+                    logger.error(
+                        f"Error releasing idempotency key=> {e}", exc_info=True
+                    )
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from borrowing.archive import archive_returned_borrows
+
+
+class Command(BaseCommand):
+    help = "Move old returned borrows from the live Borrow table to BorrowArchive"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=settings.BORROW_ARCHIVE_AFTER_DAYS,
+            help="Archive borrows returned more than this many days ago",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="Stop after this many batches, the next run continues from there",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for archived in archive_returned_borrows(
+            options["older_than_days"],
+            batch_size=options["batch_size"],
+            max_batches=options["max_batches"],
+        ):
+            total += archived
+            self.stdout.write(f"Archived {archived} borrows ({total} so far)")
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} borrows"))
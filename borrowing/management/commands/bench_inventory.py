@@ -0,0 +1,107 @@
+import multiprocessing
+import statistics
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test.utils import override_settings
+
+from borrowing.models import Borrow
+from borrowing.services import BorrowError, borrow_book, return_book
+from library.choices import CategoryChoice
+from library.inventory import reconcile_batch
+from library.models import INVENTORY_COPIES, INVENTORY_COUNTER, Author, Book, Category
+from user.models import CustomUser
+
+
+def run_worker(mode, user_id, book_id, operations):
+    """
+    Borrow and return the same title over and over, returns borrow latencies
+    """
+    connections.close_all()
+    latencies = []
+    rejected = 0
+
+    with override_settings(INVENTORY_MODE=mode):
+        user = CustomUser.objects.get(pk=user_id)
+        book = Book.objects.get(pk=book_id)
+        for _ in range(operations):
+            started = time.perf_counter()
+            try:
+                borrow = borrow_book(user, book)
+            except BorrowError:
+                rejected += 1
+                continue
+            finally:
+                latencies.append(time.perf_counter() - started)
+            return_book(user, borrow.borrow_id)
+
+    connections.close_all()
+    return latencies, rejected
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare borrow throughput on one popular title with the counter and "
+        "the copy inventory mode. Creates its own users and book and deletes "
+        "them afterwards. Run it against the production database engine, "
+        "SQLite serializes all writers whatever the mode"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=8)
+        parser.add_argument("--operations", type=int, default=200)
+        parser.add_argument("--copies", type=int, default=50)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'mode':<10} {'borrows/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'rejected':>9}"
+        )
+        for mode in (INVENTORY_COUNTER, INVENTORY_COPIES):
+            self.run_mode(mode, options)
+
+    def run_mode(self, mode, options):
+        run_id = uuid.uuid4().hex[:8]
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(username=f"bench-{run_id}-{number}")
+                for number in range(options["processes"])
+            ]
+        )
+        author = Author.objects.create(name=f"bench-{run_id}", bio="")
+        category, _ = Category.objects.get_or_create(name=CategoryChoice.FICTION)
+        book = Book.objects.create(
+            title=f"bench-{run_id}",
+            description="",
+            author=author,
+            category=category,
+            total_copies=options["copies"],
+            available_copies=options["copies"],
+        )
+        if mode == INVENTORY_COPIES:
+            reconcile_batch([book], derive=False)
+
+        try:
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            started = time.perf_counter()
+            with context.Pool(options["processes"]) as pool:
+                results = pool.starmap(
+                    run_worker,
+                    [(mode, user.pk, book.pk, options["operations"]) for user in users],
+                )
+            elapsed = time.perf_counter() - started
+        finally:
+            Borrow.objects.filter(book=book).delete()
+            author.delete()
+            CustomUser.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        latencies = sorted(latency for result, _ in results for latency in result)
+        rejected = sum(rejected for _, rejected in results)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        self.stdout.write(
+            f"{mode:<10} {(len(latencies) - rejected) / elapsed:>10.0f} "
+            f"{statistics.median(latencies) * 1000:>8.2f} {p99 * 1000:>8.2f} "
+            f"{rejected:>9}"
+        )
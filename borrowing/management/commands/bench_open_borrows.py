@@ -0,0 +1,118 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from borrowing.archive import archive_returned_borrows
+from borrowing.models import Borrow
+from library.models import Author, Book, Category
+from library.choices import CategoryChoice
+from user.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure open borrow query latency as returned history grows, "
+        "with and without archiving. Everything runs in a rolled back transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--history-sizes",
+            default="10000,100000,500000",
+            help="Comma separated total returned borrows to measure at",
+        )
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--books", type=int, default=200)
+        parser.add_argument("--queries", type=int, default=500)
+
+    def handle(self, *args, **options):
+        sizes = sorted(int(size) for size in options["history_sizes"].split(","))
+
+        with transaction.atomic():
+            users, books = self.seed(options["users"], options["books"])
+            self.stdout.write(
+                f"{'returned rows':>14} {'live p50 ms':>12} {'live p95 ms':>12} "
+                f"{'archived p50 ms':>16} {'archived p95 ms':>16}"
+            )
+
+            inserted = 0
+            for size in sizes:
+                self.add_returned_history(users, books, size - inserted)
+                inserted = size
+
+                live = self.measure(users, options["queries"])
+
+                sid = transaction.savepoint()
+                for _ in archive_returned_borrows(0, batch_size=5000):
+                    pass
+                archived = self.measure(users, options["queries"])
+                transaction.savepoint_rollback(sid)
+
+                self.stdout.write(
+                    f"{size:>14} {live[0]:>12.3f} {live[1]:>12.3f} "
+                    f"{archived[0]:>16.3f} {archived[1]:>16.3f}"
+                )
+
+            transaction.set_rollback(True)
+
+    def seed(self, user_count, book_count):
+        users = CustomUser.objects.bulk_create(
+            [CustomUser(username=f"bench-user-{i}") for i in range(user_count)]
+        )
+        author = Author.objects.create(name="bench-author", bio="")
+        category, _ = Category.objects.get_or_create(name=CategoryChoice.FICTION)
+        books = Book.objects.bulk_create(
+            [
+                Book(
+                    title=f"bench-book-{i}",
+                    description="",
+                    author=author,
+                    category=category,
+                    total_copies=100,
+                    available_copies=100,
+                )
+                for i in range(book_count)
+            ]
+        )
+
+        today = date.today()
+        Borrow.objects.bulk_create(
+            [
+                Borrow(user=user, book=random.choice(books), due_date=today)
+                for user in users
+            ]
+        )
+        return users, books
+
+    def add_returned_history(self, users, books, count, chunk_size=10000):
+        returned = date.today() - timedelta(days=400)
+        for start in range(0, count, chunk_size):
+            Borrow.objects.bulk_create(
+                [
+                    Borrow(
+                        user=random.choice(users),
+                        book=random.choice(books),
+                        due_date=returned,
+                        return_date=returned,
+                    )
+                    for _ in range(min(chunk_size, count - start))
+                ]
+            )
+
+    def measure(self, users, queries):
+        """
+        Time the open borrow list query of BorrowView.get, returns (p50, p95) in ms
+        """
+        timings = []
+        for _ in range(queries):
+            user = random.choice(users)
+            started = time.perf_counter()
+            list(Borrow.objects.filter(user=user, return_date__isnull=True))
+            timings.append((time.perf_counter() - started) * 1000)
+
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
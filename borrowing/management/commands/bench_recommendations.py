@@ -0,0 +1,78 @@
+import random
+import resource
+import time
+import tracemalloc
+from array import array
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from borrowing.recommendations import co_borrow_neighbors, np
+
+
+def synthetic_borrows(borrows, users, books, seed):
+    """
+    (user_ids, book_ids) arrays with a long tail of book popularity, like a
+    real catalog where a few titles get most borrows
+    """
+    if np is not None:
+        rng = np.random.default_rng(seed)
+        user_ids = rng.integers(1, users + 1, borrows, dtype=np.int64)
+        book_ids = (rng.zipf(1.3, borrows) - 1) % books + 1
+        return array("q", user_ids.tobytes()), array("q", book_ids.tobytes())
+
+    rng = random.Random(seed)
+    user_ids = array("q", (rng.randint(1, users) for _ in range(borrows)))
+    book_ids = array(
+        "q", (int(rng.paretovariate(0.3)) % books + 1 for _ in range(borrows))
+    )
+    return user_ids, book_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the co-borrow counting and top K selection of build_recommendations "
+        "on synthetic borrows and report its peak memory. Needs no database rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--borrows", type=int, default=10_000_000)
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--books", type=int, default=50_000)
+        parser.add_argument("--seed", type=int, default=7)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'NumPy' if np is not None else 'Pure Python'} counter, "
+            f"{options['borrows']} borrows by {options['users']} users "
+            f"of {options['books']} books"
+        )
+
+        started = time.perf_counter()
+        user_ids, book_ids = synthetic_borrows(
+            options["borrows"], options["users"], options["books"], options["seed"]
+        )
+        self.stdout.write(f"generated in {time.perf_counter() - started:.1f}s")
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = sum(
+            1
+            for _ in co_borrow_neighbors(
+                user_ids,
+                book_ids,
+                settings.RECOMMENDATION_TOP_K,
+                settings.RECOMMENDATION_MAX_BASKET,
+                settings.RECOMMENDATION_MIN_SCORE,
+            )
+        )
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.stdout.write(f"{rows} neighbor rows in {elapsed:.1f}s")
+        self.stdout.write(f"peak traced memory {peak / 2**20:.0f} MB")
+        self.stdout.write(
+            "peak RSS "
+            f"{resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB"
+        )
@@ -0,0 +1,55 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from borrowing.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Delete expired idempotency keys in small batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and prune every N seconds (0 runs once)",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        interval = options["interval"]
+
+        while True:
+            deleted = self.prune(batch_size)
+            self.stdout.write(f"Deleted {deleted} expired idempotency keys")
+
+            if not interval:
+                break
+            time.sleep(interval)
+
+    def prune(self, batch_size):
+        """
+        Delete by primary key batches so the table is never locked for long
+        """
+        total = 0
+        while True:
+            expired_ids = list(
+                IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+                .order_by("expires_at")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not expired_ids:
+                return total
+
+            try:
+                deleted, _ = IdempotencyKey.objects.filter(pk__in=expired_ids).delete()
+                total += deleted
+            except Exception as e:
+                logger.error(f"Error pruning idempotency keys=> {e}", exc_info=True)
+                raise
@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from borrowing.summary import invalidate_user_summary
+from library.models import Book, copy_inventory_enabled
+from user.models import MAX_ACTIVE_BORROWS, CustomUser
+
+OPEN_BORROWS = Count("borrows", filter=Q(borrows__return_date__isnull=True))
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild each user's active borrow count from their open borrows and, "
+        "when INVENTORY_MODE is counter, each book's available copies from "
+        "its total and open borrows. Counts above the limits are clamped and "
+        "reported"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Report the drift, change nothing"
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        with transaction.atomic():
+            users = self.repair_users(dry_run)
+            books = 0
+            if copy_inventory_enabled():
+                self.stdout.write(
+                    "INVENTORY_MODE is copies, run reconcile_inventory for "
+                    "available copies"
+                )
+            else:
+                books = self.repair_books(dry_run)
+            if dry_run:
+                transaction.set_rollback(True)
+
+        verb = "Would repair" if dry_run else "Repaired"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {users} users and {books} books"))
+
+    def repair_users(self, dry_run):
+        drifted = (
+            CustomUser.objects.annotate(open_borrows=OPEN_BORROWS)
+            .exclude(active_borrow_count=F("open_borrows"))
+            .values_list("pk", "username", "active_borrow_count", "open_borrows")
+        )
+
+        repaired = []
+        for pk, username, counted, open_borrows in drifted:
+            if open_borrows > MAX_ACTIVE_BORROWS:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"{username} has {open_borrows} open borrows, over the "
+                        f"limit of {MAX_ACTIVE_BORROWS}"
+                    )
+                )
+            fixed = min(open_borrows, MAX_ACTIVE_BORROWS)
+            if fixed == counted:
+                continue
+            self.stdout.write(f"{username}: active borrow count {counted} -> {fixed}")
+            if not dry_run:
+                CustomUser.objects.filter(pk=pk).update(active_borrow_count=fixed)
+            repaired.append(pk)
+
+        if repaired and not dry_run:
+            invalidate_user_summary(*repaired)
+        return len(repaired)
+
+    def repair_books(self, dry_run):
+        books = Book.objects.annotate(open_borrows=OPEN_BORROWS).values_list(
+            "pk", "title", "total_copies", "available_copies", "open_borrows"
+        )
+
+        repaired = 0
+        for pk, title, total, available, open_borrows in books.iterator(
+            chunk_size=2000
+        ):
+            fixed = min(max(total - open_borrows, 0), total)
+            if fixed == available:
+                continue
+            self.stdout.write(f"{title}: available copies {available} -> {fixed}")
+            if not dry_run:
+                Book.objects.filter(pk=pk).update(available_copies=fixed)
+            repaired += 1
+        return repaired
@@ -0,0 +1,56 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from borrowing.notifications import get_backend, send_due_reminders
+
+
+class Command(BaseCommand):
+    help = (
+        "Send every member one digest of their borrows due in the next days. "
+        "Safe to rerun, reminders already sent for a due date are skipped"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=settings.DUE_REMINDER_DAYS,
+            help="Remind about borrows due within this many days",
+        )
+        parser.add_argument(
+            "--backend",
+            default=settings.NOTIFICATION_BACKEND,
+            help="Dotted path of the notification backend class",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=settings.NOTIFICATION_WORKERS
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=settings.NOTIFICATION_RATE_LIMIT,
+            help="Messages per second at most, 0 for no limit",
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        outcomes = send_due_reminders(
+            options["days"],
+            get_backend(options["backend"]),
+            workers=options["workers"],
+            rate=options["rate"],
+            chunk_size=options["chunk_size"],
+        )
+        elapsed = time.perf_counter() - started
+
+        message = (
+            f"Sent {outcomes['sent']} digests in {elapsed:.2f}s, "
+            f"{outcomes['failed']} failed, {outcomes['skipped']} skipped"
+        )
+        if outcomes["failed"]:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,266 @@
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client, override_settings
+
+from borrowing.models import Borrow
+from library.choices import CategoryChoice
+from library.models import Author, Book, Category
+from library_management.breaker import db_breaker
+from user.models import CustomUser
+from user.serializers import TokenObtainPairWithClaimsSerializer
+
+PHASES = ("before", "fault", "after")
+
+
+class Timeline:
+    """
+    Fault window relative to the start of the run
+    """
+
+    def __init__(self, fault_start, fault_seconds):
+        self.started = time.monotonic()
+        self.fault_start = fault_start
+        self.fault_end = fault_start + fault_seconds
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def phase(self):
+        elapsed = self.elapsed()
+        if elapsed < self.fault_start:
+            return "before"
+        if elapsed < self.fault_end:
+            return "fault"
+        return "after"
+
+
+def hold_write_lock(path, timeline, stop):
+    """
+    Take SQLite's exclusive lock from a second connection for the fault
+    window, so every other connection waits on it like behind a long writer
+    """
+    while timeline.phase() == "before" and not stop.is_set():
+        time.sleep(0.01)
+
+    lock_connection = sqlite3.connect(path, isolation_level=None)
+    try:
+        lock_connection.execute("BEGIN EXCLUSIVE")
+        while timeline.phase() == "fault" and not stop.is_set():
+            time.sleep(0.01)
+        lock_connection.execute("ROLLBACK")
+    finally:
+        lock_connection.close()
+
+
+def run_client(access_token, user_id, book_id, timeline, duration, results):
+    """
+    Cycle through book list, book detail and borrow + return until the run
+    is over, recording (phase, endpoint, status, latency, stale)
+    """
+    client = Client(HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {access_token}")
+    requests = [
+        ("book_list", lambda: client.get("/api/books/")),
+        ("book_detail", lambda: client.get(f"/api/books/{book_id}/")),
+        ("borrow", lambda: client.post("/api/borrow/", {"book_id": book_id})),
+    ]
+
+    def send(endpoint, request):
+        phase = timeline.phase()
+        started = time.perf_counter()
+        response = request()
+        results.append(
+            (
+                phase,
+                endpoint,
+                response.status_code,
+                time.perf_counter() - started,
+                response.headers.get("Stale-Response") == "true",
+            )
+        )
+        return response
+
+    try:
+        while timeline.elapsed() < duration:
+            for endpoint, request in requests:
+                response = send(endpoint, request)
+                if endpoint != "borrow" or response.status_code != 201:
+                    continue
+                try:
+                    borrow_id = (
+                        Borrow.objects.filter(user_id=user_id, return_date__isnull=True)
+                        .values_list("borrow_id", flat=True)
+                        .first()
+                    )
+                except OperationalError:
+                    continue
+                if borrow_id is not None:
+                    send(
+                        "return",
+                        lambda: client.post(
+                            "/api/return/", {"borrow_id": str(borrow_id)}
+                        ),
+                    )
+    finally:
+        connections.close_all()
+
+
+def watch_breaker(timeline, stop, transitions):
+    state = None
+    while not stop.is_set():
+        if db_breaker.state != state:
+            state = db_breaker.state
+            transitions.append((timeline.elapsed(), state))
+        time.sleep(0.05)
+
+
+class Command(BaseCommand):
+    help = (
+        "Simulate a saturated database while clients hit book list, book "
+        "detail, borrow and return, then report status codes, stale answers "
+        "and latencies before, during and after the fault. The fault is "
+        "SQLite's exclusive lock held from a second connection. Creates its "
+        "own users and book and deletes them afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=45)
+        parser.add_argument("--fault-start", type=float, default=5)
+        parser.add_argument("--fault-seconds", type=float, default=20)
+        parser.add_argument(
+            "--db-timeout",
+            type=float,
+            default=1,
+            help="SQLite busy timeout for the run, in seconds",
+        )
+
+    def handle(self, *args, **options):
+        database = connections.settings["default"]
+        if database["ENGINE"] != "django.db.backends.sqlite3":
+            raise CommandError("The lock fault needs SQLite")
+
+        run_id = uuid.uuid4().hex[:8]
+        author = Author.objects.create(name=f"contention-{run_id}", bio="")
+        category, _ = Category.objects.get_or_create(name=CategoryChoice.FICTION)
+        book = Book.objects.create(
+            title=f"contention-{run_id}",
+            description="",
+            author=author,
+            category=category,
+            total_copies=options["threads"],
+            available_copies=options["threads"],
+        )
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(username=f"contention-{run_id}-{number}")
+                for number in range(options["threads"])
+            ]
+        )
+
+        database_options = database.setdefault("OPTIONS", {})
+        timeout = database_options.get("timeout", 5)
+        database_options["timeout"] = options["db_timeout"]
+        connections.close_all()
+        db_breaker.reset()
+
+        # Silk writes every request to the database, it would hide the fault
+        middleware = [
+            name for name in settings.MIDDLEWARE if not name.startswith("silk")
+        ]
+        try:
+            with override_settings(
+                MIDDLEWARE=middleware, JWT_STATELESS_ACCESS_TOKENS=True
+            ):
+                results, transitions = self.run(book, users, options)
+        finally:
+            database_options["timeout"] = timeout
+            connections.close_all()
+            db_breaker.reset()
+            Borrow.objects.filter(book=book).delete()
+            author.delete()
+            CustomUser.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        self.report(results, transitions)
+
+    def run(self, book, users, options):
+        timeline = Timeline(options["fault_start"], options["fault_seconds"])
+        stop = threading.Event()
+        results, transitions = [], []
+
+        injector = threading.Thread(
+            target=hold_write_lock,
+            args=(connections.settings["default"]["NAME"], timeline, stop),
+        )
+        injector.start()
+
+        watcher = threading.Thread(
+            target=watch_breaker, args=(timeline, stop, transitions)
+        )
+        watcher.start()
+
+        clients = [
+            threading.Thread(
+                target=run_client,
+                args=(
+                    str(
+                        TokenObtainPairWithClaimsSerializer.get_token(user).access_token
+                    ),
+                    user.pk,
+                    book.pk,
+                    timeline,
+                    options["duration"],
+                    results,
+                ),
+            )
+            for user in users
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+        stop.set()
+        watcher.join()
+        injector.join()
+        return results, transitions
+
+    def report(self, results, transitions):
+        grouped = defaultdict(list)
+        for phase, endpoint, status, latency, stale in results:
+            grouped[phase, endpoint].append((status, latency, stale))
+
+        self.stdout.write(
+            f"{'phase':<8} {'endpoint':<12} {'requests':>9} {'p50 ms':>8} "
+            f"{'p99 ms':>8} {'stale':>6}  statuses"
+        )
+        for phase in PHASES:
+            for endpoint in ("book_list", "book_detail", "borrow", "return"):
+                rows = grouped.get((phase, endpoint))
+                if not rows:
+                    continue
+                latencies = sorted(latency for _, latency, _ in rows)
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                statuses = defaultdict(int)
+                for status, _, _ in rows:
+                    statuses[status] += 1
+                self.stdout.write(
+                    f"{phase:<8} {endpoint:<12} {len(rows):>9} "
+                    f"{statistics.median(latencies) * 1000:>8.1f} {p99 * 1000:>8.1f} "
+                    f"{sum(stale for _, _, stale in rows):>6}  "
+                    + " ".join(
+                        f"{status}x{count}"
+                        for status, count in sorted(statuses.items())
+                    )
+                )
+
+        self.stdout.write("\nbreaker")
+        for elapsed, state in transitions:
+            self.stdout.write(f"{elapsed:>6.1f}s {state}")
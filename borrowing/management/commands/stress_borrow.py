@@ -0,0 +1,146 @@
+import multiprocessing
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count, Q
+
+from borrowing.models import Borrow
+from borrowing.services import BorrowError, borrow_book, return_book
+from library.choices import CategoryChoice
+from library.models import Author, Book, Category
+from user.models import MAX_ACTIVE_BORROWS, CustomUser
+
+
+def run_worker(user_ids, book_ids, operations, seed):
+    """
+    Borrow and return at random as fast as possible, returns outcome counts
+    """
+    connections.close_all()
+    rng = random.Random(seed)
+    outcomes = {"borrowed": 0, "returned": 0, "rejected": 0, "errors": 0}
+
+    for _ in range(operations):
+        user = CustomUser.objects.get(pk=rng.choice(user_ids))
+        try:
+            if rng.random() < 0.6:
+                book = Book.objects.get(pk=rng.choice(book_ids))
+                borrow_book(user, book)
+                outcomes["borrowed"] += 1
+            else:
+                borrow_id = (
+                    Borrow.objects.filter(user=user, return_date__isnull=True)
+                    .values_list("borrow_id", flat=True)
+                    .first()
+                )
+                return_book(user, borrow_id or uuid.uuid4())
+                outcomes["returned"] += 1
+        except BorrowError:
+            outcomes["rejected"] += 1
+        except Exception:
+            outcomes["errors"] += 1
+
+    connections.close_all()
+    return outcomes
+
+
+class Command(BaseCommand):
+    help = (
+        "Borrow and return from many processes at once against the configured "
+        "database, then check that no user is over the limit and no book count "
+        "is off. Creates its own users and books and deletes them afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=8)
+        parser.add_argument("--operations", type=int, default=200)
+        parser.add_argument("--users", type=int, default=5)
+        parser.add_argument("--books", type=int, default=3)
+        parser.add_argument("--copies", type=int, default=4)
+
+    def handle(self, *args, **options):
+        run_id = uuid.uuid4().hex[:8]
+        user_ids, book_ids, author = self.seed(run_id, options)
+
+        try:
+            connections.close_all()
+            context = multiprocessing.get_context("fork")
+            started = time.perf_counter()
+            with context.Pool(options["processes"]) as pool:
+                results = pool.starmap(
+                    run_worker,
+                    [
+                        (user_ids, book_ids, options["operations"], seed)
+                        for seed in range(options["processes"])
+                    ],
+                )
+            elapsed = time.perf_counter() - started
+
+            totals = {key: sum(result[key] for result in results) for key in results[0]}
+            operations = options["processes"] * options["operations"]
+            self.stdout.write(
+                f"{operations} operations in {elapsed:.2f}s "
+                f"({operations / elapsed:.0f}/s): {totals}"
+            )
+
+            violations = self.find_violations(user_ids, book_ids)
+            for violation in violations:
+                self.stdout.write(self.style.ERROR(violation))
+        finally:
+            author.delete()
+            CustomUser.objects.filter(pk__in=user_ids).delete()
+
+        if violations:
+            raise CommandError(f"{len(violations)} violations found")
+        self.stdout.write(self.style.SUCCESS("0 violations"))
+
+    def seed(self, run_id, options):
+        users = CustomUser.objects.bulk_create(
+            [
+                CustomUser(username=f"stress-{run_id}-{number}")
+                for number in range(options["users"])
+            ]
+        )
+        author = Author.objects.create(name=f"stress-{run_id}", bio="")
+        category, _ = Category.objects.get_or_create(name=CategoryChoice.FICTION)
+        books = Book.objects.bulk_create(
+            [
+                Book(
+                    title=f"stress-{run_id}-{number}",
+                    description="",
+                    author=author,
+                    category=category,
+                    total_copies=options["copies"],
+                    available_copies=options["copies"],
+                )
+                for number in range(options["books"])
+            ]
+        )
+        return [user.pk for user in users], [book.pk for book in books], author
+
+    def find_violations(self, user_ids, book_ids):
+        violations = []
+        open_borrows = Count("borrows", filter=Q(borrows__return_date__isnull=True))
+
+        for user in CustomUser.objects.filter(pk__in=user_ids).annotate(
+            open_borrows=open_borrows
+        ):
+            if user.open_borrows > MAX_ACTIVE_BORROWS:
+                violations.append(f"{user} has {user.open_borrows} open borrows")
+            if user.open_borrows != user.active_borrow_count:
+                violations.append(
+                    f"{user} has {user.open_borrows} open borrows but a count of "
+                    f"{user.active_borrow_count}"
+                )
+
+        for book in Book.objects.filter(pk__in=book_ids).annotate(
+            open_borrows=open_borrows
+        ):
+            if book.available_copies + book.open_borrows != book.total_copies:
+                violations.append(
+                    f"{book.title} has {book.available_copies} available and "
+                    f"{book.open_borrows} borrowed of {book.total_copies}"
+                )
+        return violations
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0002_idempotencykey"),
+        ("library", "0004_book"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="borrow",
+            index=models.Index(
+                condition=models.Q(("return_date__isnull", True)),
+                fields=["user", "due_date"],
+                name="borrow_open_by_user_idx",
+            ),
+        ),
+    ]
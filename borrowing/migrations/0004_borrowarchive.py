@@ -0,0 +1,65 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0003_borrow_open_by_user_idx"),
+        ("library", "0004_book"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BorrowArchive",
+            fields=[
+                ("borrow_id", models.UUIDField(primary_key=True, serialize=False)),
+                ("borrow_date", models.DateField()),
+                ("due_date", models.DateField()),
+                ("return_date", models.DateField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="borrow",
+            index=models.Index(
+                condition=models.Q(("return_date__isnull", False)),
+                fields=["return_date"],
+                name="borrow_returned_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="borrowarchive",
+            name="book",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="archived_borrows",
+                to="library.book",
+            ),
+        ),
+        migrations.AddField(
+            model_name="borrowarchive",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="archived_borrows",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowarchive",
+            index=models.Index(
+                fields=["user", "borrow_date"], name="borrow_archive_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="borrowarchive",
+            index=models.Index(
+                fields=["return_date"], name="borrow_archive_returned_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Least
+
+# MAX_ACTIVE_BORROWS when this migration was written, the CHECK constraint
+# added by user 0002 rejects anything above it
+BORROW_LIMIT = 3
+
+
+def backfill_active_borrow_count(apps, schema_editor):
+    CustomUser = apps.get_model("user", "CustomUser")
+    Borrow = apps.get_model("borrowing", "Borrow")
+
+    open_borrows = (
+        Borrow.objects.filter(user=OuterRef("pk"), return_date__isnull=True)
+        .values("user")
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    # Users that went over the limit before it was enforced keep their borrows,
+    # their count is clamped to the limit and reported
+    over_limit = CustomUser.objects.annotate(
+        open_borrows=Subquery(open_borrows)
+    ).filter(open_borrows__gt=BORROW_LIMIT)
+    for username, total in over_limit.values_list("username", "open_borrows"):
+        print(
+            f"\n  {username} has {total} open borrows, over the limit of {BORROW_LIMIT}"
+        )
+
+    CustomUser.objects.update(
+        active_borrow_count=Least(
+            Coalesce(Subquery(open_borrows), Value(0)), Value(BORROW_LIMIT)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0004_borrowarchive"),
+        ("user", "0002_active_borrow_count"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_active_borrow_count, migrations.RunPython.noop),
+    ]
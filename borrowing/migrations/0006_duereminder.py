@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0005_backfill_active_borrow_count"),
+        ("library", "0006_book_available_lte_total"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DueReminder",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("due_date", models.DateField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("sent_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="borrow",
+            index=models.Index(
+                condition=models.Q(("return_date__isnull", True)),
+                fields=["due_date"],
+                name="borrow_open_due_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="duereminder",
+            name="borrow",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="reminders",
+                to="borrowing.borrow",
+            ),
+        ),
+        migrations.AddField(
+            model_name="duereminder",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="due_reminders",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="duereminder",
+            constraint=models.UniqueConstraint(
+                fields=("borrow", "due_date"), name="unique_due_reminder"
+            ),
+        ),
+    ]
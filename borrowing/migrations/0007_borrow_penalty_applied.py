@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:26
+
+from django.db import migrations, models
+
+
+def mark_returned_borrows_applied(apps, schema_editor):
+    # Returns made before the task queue added their penalty inline
+    Borrow = apps.get_model("borrowing", "Borrow")
+    Borrow.objects.filter(return_date__isnull=False).update(penalty_applied=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0006_duereminder"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="borrow",
+            name="penalty_applied",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_returned_borrows_applied, migrations.RunPython.noop),
+    ]
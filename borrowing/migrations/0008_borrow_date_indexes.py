@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0007_borrow_penalty_applied"),
+        ("library", "0006_book_available_lte_total"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="borrow",
+            index=models.Index(fields=["borrow_date"], name="borrow_borrowed_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="borrowarchive",
+            index=models.Index(
+                fields=["borrow_date"], name="borrow_archive_borrowed_idx"
+            ),
+        ),
+    ]
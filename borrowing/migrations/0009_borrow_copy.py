@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("borrowing", "0008_borrow_date_indexes"),
+        ("library", "0007_bookcopy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="borrow",
+            name="copy",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="borrows",
+                to="library.bookcopy",
+            ),
+        ),
+    ]
@@ -1,9 +1,102 @@
-from django.db import models
+from collections import Counter, defaultdict
+from django.db import models, transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest, Least
 from user.models import CustomUser
-from library.models import Book
+from library.models import Book, BookCopy, copy_inventory_enabled
 from uuid import uuid4
 from datetime import date
 
+LENDING_PERIOD_DAYS = 14
+BULK_UPDATE_CHUNK_SIZE = 500
+
+
+def increment_by_pk(queryset, field, increments, floor=None, ceiling=None):
+    """
+    Add a different amount to `field` of many rows in one UPDATE
+    - With a floor the new value never goes below it
+    - With a ceiling, an expression such as F("total_copies"), it never goes above it
+    """
+    if not increments:
+        return 0
+    value = F(field) + Case(
+        *[When(pk=pk, then=Value(amount)) for pk, amount in increments.items()],
+        default=Value(0),
+    )
+    if floor is not None:
+        value = Greatest(value, Value(floor))
+    if ceiling is not None:
+        value = Least(value, ceiling)
+    return queryset.filter(pk__in=increments.keys()).update(**{field: value})
+
+
+class BorrowQuerySet(models.QuerySet):
+    def open(self):
+        return self.filter(return_date__isnull=True)
+
+    def mark_returned(self):
+        """
+        Return every open borrow in the queryset with set based updates
+        - One UPDATE each for borrows, book copies, penalty points and
+          active borrow counts per chunk
+        - With copy inventory the copy rows are freed and Book.available_copies
+          is left to reconcile_inventory
+        - Overdue borrows add penalty points like a normal return
+        - available_copies never goes above total_copies, even when the
+          counter was already off
+        Returns the ids of the users whose borrows were returned
+        """
+        today = date.today()
+        user_ids = set()
+
+        with transaction.atomic():
+            rows = list(
+                self.open()
+                .select_for_update()
+                .values_list("borrow_id", "book_id", "user_id", "due_date", "copy_id")
+            )
+
+            for start in range(0, len(rows), BULK_UPDATE_CHUNK_SIZE):
+                chunk = rows[start : start + BULK_UPDATE_CHUNK_SIZE]
+                returned_copies = Counter()
+                returned_borrows = Counter()
+                penalties = defaultdict(int)
+                copy_ids = []
+                legacy_books = []
+
+                for _, book_id, user_id, due_date, copy_id in chunk:
+                    returned_copies[book_id] += 1
+                    if copy_id is not None:
+                        copy_ids.append(copy_id)
+                    else:
+                        legacy_books.append(book_id)
+                    returned_borrows[user_id] -= 1
+                    user_ids.add(user_id)
+                    if today > due_date:
+                        penalties[user_id] += (today - due_date).days
+
+                Borrow.objects.filter(
+                    pk__in=[row[0] for row in chunk], return_date__isnull=True
+                ).update(return_date=today, penalty_applied=True)
+                BookCopy.objects.filter(pk__in=copy_ids).update(is_available=True)
+                if copy_inventory_enabled():
+                    for book_id in legacy_books:
+                        BookCopy.objects.release_any(book_id)
+                else:
+                    increment_by_pk(
+                        Book.objects,
+                        "available_copies",
+                        returned_copies,
+                        ceiling=F("total_copies"),
+                    )
+                increment_by_pk(CustomUser.objects, "penalty_points", penalties)
+                increment_by_pk(
+                    CustomUser.objects, "active_borrow_count", returned_borrows, floor=0
+                )
+
+        return user_ids
+
+
 class Borrow(models.Model):
     borrow_id = models.UUIDField(primary_key=True, default=uuid4)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name="borrows")
@@ -11,6 +104,32 @@ class Borrow(models.Model):
     borrow_date = models.DateField(auto_now_add=True)
     due_date = models.DateField()
     return_date = models.DateField(null=True, blank=True)
+    penalty_applied = models.BooleanField(default=False)
+    copy = models.ForeignKey(
+        BookCopy, on_delete=models.SET_NULL, null=True, blank=True, related_name="borrows"
+    )
+
+    objects = BorrowQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "due_date"],
+                condition=models.Q(return_date__isnull=True),
+                name="borrow_open_by_user_idx",
+            ),
+            models.Index(
+                fields=["due_date"],
+                condition=models.Q(return_date__isnull=True),
+                name="borrow_open_due_idx",
+            ),
+            models.Index(fields=["borrow_date"], name="borrow_borrowed_idx"),
+            models.Index(
+                fields=["return_date"],
+                condition=models.Q(return_date__isnull=False),
+                name="borrow_returned_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"borrow id: {self.borrow_id}, user: {self.user.username}"
@@ -20,3 +139,98 @@ class Borrow(models.Model):
     
     def days_late(self):
         return (date.today()  - self.due_date).days
+
+    def penalty_points(self):
+        """
+        Points for a returned borrow, 1 per day it came back late
+        """
+        return max((self.return_date - self.due_date).days, 0)
+
+
+class BorrowArchive(models.Model):
+    """
+    Returned borrows moved out of the live Borrow table by the archive_borrows command
+    - Keeps the primary key of the original Borrow row
+    """
+
+    borrow_id = models.UUIDField(primary_key=True)
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="archived_borrows"
+    )
+    book = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="archived_borrows"
+    )
+    borrow_date = models.DateField()
+    due_date = models.DateField()
+    return_date = models.DateField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["user", "borrow_date"], name="borrow_archive_user_idx"
+            ),
+            models.Index(fields=["return_date"], name="borrow_archive_returned_idx"),
+            models.Index(fields=["borrow_date"], name="borrow_archive_borrowed_idx"),
+        ]
+
+    def __str__(self):
+        return f"archived borrow id: {self.borrow_id}, user id: {self.user_id}"
+
+
+class DueReminder(models.Model):
+    """
+    Marker of a due date reminder, written before the reminder is sent
+    - One per borrow and due date, so reruns of send_due_reminders skip it
+    - sent_at stays null until the backend accepted the message
+    """
+
+    borrow = models.ForeignKey(Borrow, on_delete=models.CASCADE, related_name="reminders")
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="due_reminders"
+    )
+    due_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["borrow", "due_date"], name="unique_due_reminder"
+            )
+        ]
+
+    def __str__(self):
+        return f"reminder for borrow id: {self.borrow_id}, due: {self.due_date}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored outcome of a POST sent with an Idempotency-Key header
+    - A replay with the same key gets the stored response back
+    - status_code is null while the first request is still running
+    """
+
+    key = models.CharField(max_length=255)
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="idempotency_keys"
+    )
+    endpoint = models.CharField(max_length=50)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    response_body = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "endpoint", "key"], name="unique_idempotency_key"
+            )
+        ]
+
+    def __str__(self):
+        return f"idempotency key: {self.key}, endpoint: {self.endpoint}"
+
+    def is_completed(self):
+        return self.status_code is not None
@@ -0,0 +1,255 @@
+import json
+import logging
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Borrow, DueReminder
+
+logger = logging.getLogger(__name__)
+
+DIGEST_FIELDS = [
+    "borrow_id",
+    "user_id",
+    "user__username",
+    "user__email",
+    "book__title",
+    "due_date",
+]
+
+
+class Digest:
+    """
+    One reminder message for one user, covering every borrow due soon
+    """
+
+    __slots__ = ("user_id", "username", "email", "borrows", "subject", "body")
+
+    def __init__(self, user_id, username, email, borrows):
+        self.user_id = user_id
+        self.username = username
+        self.email = email
+        self.borrows = borrows
+        self.subject = f"{len(borrows)} borrowed book(s) due soon"
+        self.body = render_to_string(
+            "borrowing/due_reminder.txt",
+            {"username": username, "borrows": borrows, "today": date.today()},
+        )
+
+
+class BaseNotificationBackend:
+    """
+    Delivers digests, send() is called from several threads at once and must
+    raise on failure so the digest is retried by the next run
+    """
+
+    def send(self, digest):
+        raise NotImplementedError
+
+
+class EmailNotificationBackend(BaseNotificationBackend):
+    """
+    Sends through Django's EMAIL_BACKEND, users without an email are skipped
+    """
+
+    def send(self, digest):
+        send_mail(
+            digest.subject,
+            digest.body,
+            settings.DEFAULT_FROM_EMAIL,
+            [digest.email],
+            fail_silently=False,
+        )
+
+
+class ConsoleNotificationBackend(BaseNotificationBackend):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def send(self, digest):
+        with self.lock:
+            self.stream.write(f"To: {digest.username}\nSubject: {digest.subject}\n\n")
+            self.stream.write(digest.body + "\n")
+            self.stream.flush()
+
+
+class FileNotificationBackend(BaseNotificationBackend):
+    """
+    Appends every digest as a JSON line to NOTIFICATION_FILE_PATH
+    """
+
+    def __init__(self, path=None):
+        self.path = path or settings.NOTIFICATION_FILE_PATH
+        self.lock = threading.Lock()
+
+    def send(self, digest):
+        line = json.dumps(
+            {
+                "user_id": digest.user_id,
+                "email": digest.email,
+                "subject": digest.subject,
+                "body": digest.body,
+            }
+        )
+        with self.lock, open(self.path, "a") as file:
+            file.write(line + "\n")
+
+
+def get_backend(path=None):
+    return import_string(path or settings.NOTIFICATION_BACKEND)()
+
+
+class RateLimiter:
+    """
+    Token bucket shared by the delivery threads, `rate` sends per second at most
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_for = (1 - self.tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def iter_due_digests(days, chunk_size=2000):
+    """
+    Stream one Digest per user with open borrows due in the next `days` days
+    - A range scan of the open borrow due date index, reminders already sent
+      for the same due date are left out
+    """
+    today = date.today()
+    already_sent = DueReminder.objects.filter(
+        borrow_id=OuterRef("pk"), due_date=OuterRef("due_date")
+    )
+    rows = (
+        Borrow.objects.open()
+        .filter(due_date__gte=today, due_date__lte=today + timedelta(days=days))
+        .exclude(Exists(already_sent))
+        .order_by("user_id", "due_date")
+        .values(*DIGEST_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+
+    for user_id, borrows in groupby(rows, key=lambda row: row["user_id"]):
+        borrows = list(borrows)
+        first = borrows[0]
+        yield Digest(user_id, first["user__username"], first["user__email"], borrows)
+
+
+def claim_digest(digest):
+    """
+    Write the send markers before sending, so a rerun or a second run at the
+    same time never sends the same reminder twice
+    Returns False when another run already claimed one of the borrows
+    """
+    try:
+        with transaction.atomic():
+            DueReminder.objects.bulk_create(
+                [
+                    DueReminder(
+                        borrow_id=borrow["borrow_id"],
+                        user_id=digest.user_id,
+                        due_date=borrow["due_date"],
+                    )
+                    for borrow in digest.borrows
+                ]
+            )
+    except IntegrityError:
+        return False
+    return True
+
+
+def release_digest(digest):
+    """
+    Drop the markers of a digest that failed to send, the next run retries it
+    """
+    DueReminder.objects.filter(
+        borrow_id__in=[borrow["borrow_id"] for borrow in digest.borrows],
+        sent_at__isnull=True,
+    ).delete()
+
+
+def deliver(backend, limiter, digest):
+    limiter.acquire()
+    backend.send(digest)
+
+
+def send_due_reminders(days, backend, workers=4, rate=10, chunk_size=2000):
+    """
+    Send one digest per user with borrows due in the next `days` days
+    - Digests are delivered by a pool of `workers` threads, `rate` per second
+      at most, with a bounded number of digests in flight
+    - A crash between claiming and sending loses that reminder rather than
+      sending it twice
+    Returns a dict of outcome counts
+    """
+    limiter = RateLimiter(rate, burst=workers)
+    outcomes = {"sent": 0, "failed": 0, "skipped": 0}
+    in_flight = {}
+
+    def collect(done):
+        sent = []
+        for future in done:
+            digest = in_flight.pop(future)
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(
+                    f"Error sending due reminder to user {digest.user_id}=> {e}",
+                    exc_info=True,
+                )
+                release_digest(digest)
+                outcomes["failed"] += 1
+            else:
+                sent.extend(borrow["borrow_id"] for borrow in digest.borrows)
+                outcomes["sent"] += 1
+        DueReminder.objects.filter(borrow_id__in=sent, sent_at__isnull=True).update(
+            sent_at=timezone.now()
+        )
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for digest in iter_due_digests(days, chunk_size=chunk_size):
+            if isinstance(backend, EmailNotificationBackend) and not digest.email:
+                outcomes["skipped"] += 1
+                continue
+            if not claim_digest(digest):
+                outcomes["skipped"] += 1
+                continue
+
+            in_flight[executor.submit(deliver, backend, limiter, digest)] = digest
+            if len(in_flight) >= workers * 2:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+
+        collect(wait(in_flight).done)
+
+    return outcomes
@@ -0,0 +1,201 @@
+"""
+"Readers who borrowed this also borrowed" from the co-borrow matrix
+
+Entry (a, b) of the matrix is the number of readers who borrowed both book a
+and book b. Only the top K entries of every row are kept, in BookNeighbor.
+"""
+
+import logging
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from library.models import BookNeighbor
+
+from .models import Borrow, BorrowArchive
+
+try:
+    import numpy as np
+except ImportError:  # optional, the pure Python counter is used without it
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Pairs collected before they are merged into the running counts
+PAIR_MERGE_SIZE = 20_000_000
+
+
+def load_borrow_pairs(chunk_size=20000):
+    """
+    (user_id, book_id) of every live and archived borrow, streamed from the
+    database into two compact int64 arrays
+    """
+    user_ids = array("q")
+    book_ids = array("q")
+    for model in (Borrow, BorrowArchive):
+        rows = model.objects.values_list("user_id", "book_id").iterator(
+            chunk_size=chunk_size
+        )
+        for user_id, book_id in rows:
+            user_ids.append(user_id)
+            book_ids.append(book_id)
+    return user_ids, book_ids
+
+
+def merge_counts(keys, counts, new_keys):
+    """
+    Add one count for every key in new_keys to the sorted (keys, counts) arrays
+    """
+    all_keys = np.concatenate([keys, *new_keys])
+    weights = np.concatenate([counts, np.ones(len(all_keys) - len(keys), np.int64)])
+    keys, inverse = np.unique(all_keys, return_inverse=True)
+    return keys, np.bincount(inverse, weights=weights).astype(np.int64)
+
+
+def co_borrow_neighbors_numpy(user_ids, book_ids, top_k, max_basket, min_score):
+    """
+    Vectorized co-borrow counting
+    - Borrows are sorted by user, then pairs of books in the same basket are
+      found by comparing the sorted arrays with themselves shifted by 1, 2, ...
+      up to the largest basket, one array operation per shift
+    - A pair (a, b) is packed into one int64 key, a * books + b, and counted
+      with np.unique
+    """
+    users = np.frombuffer(user_ids, dtype=np.int64)
+    book_values, books = np.unique(
+        np.frombuffer(book_ids, dtype=np.int64), return_inverse=True
+    )
+    book_count = len(book_values)
+
+    # Sort by user and book, then drop repeated borrows of the same book
+    order = np.lexsort((books, users))
+    users, books = users[order], books[order]
+    keep = np.ones(len(users), dtype=bool)
+    keep[1:] = (users[1:] != users[:-1]) | (books[1:] != books[:-1])
+    users, books = users[keep], books[keep]
+
+    # Baskets of one book add nothing and huge ones (staff, test accounts)
+    # would dominate the pair count, both are left out
+    starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+    sizes = np.diff(np.r_[starts, len(users)])
+    keep = np.repeat((sizes > 1) & (sizes <= max_basket), sizes)
+    users, books = users[keep], books[keep]
+
+    keys = np.empty(0, dtype=np.int64)
+    counts = np.empty(0, dtype=np.int64)
+    pending, pending_size = [], 0
+    for shift in range(1, max_basket):
+        same_user = users[:-shift] == users[shift:]
+        if not same_user.any():
+            break
+        first, second = books[:-shift][same_user], books[shift:][same_user]
+        pending += [first * book_count + second, second * book_count + first]
+        pending_size += 2 * len(first)
+        if pending_size >= PAIR_MERGE_SIZE:
+            keys, counts = merge_counts(keys, counts, pending)
+            pending, pending_size = [], 0
+    if pending:
+        keys, counts = merge_counts(keys, counts, pending)
+
+    strong = counts >= min_score
+    keys, counts = keys[strong], counts[strong]
+    anchors, neighbors = keys // book_count, keys % book_count
+
+    # Strongest first within every anchor book, then keep the first top_k
+    order = np.lexsort((neighbors, -counts, anchors))
+    anchors, neighbors, counts = anchors[order], neighbors[order], counts[order]
+    starts = np.flatnonzero(np.r_[True, anchors[1:] != anchors[:-1]])
+    ranks = np.arange(len(anchors)) - np.repeat(
+        starts, np.diff(np.r_[starts, len(anchors)])
+    )
+    kept = ranks < top_k
+
+    for anchor, neighbor, rank, count in zip(
+        book_values[anchors[kept]].tolist(),
+        book_values[neighbors[kept]].tolist(),
+        ranks[kept].tolist(),
+        counts[kept].tolist(),
+    ):
+        yield anchor, neighbor, rank, count
+
+
+def co_borrow_neighbors_python(user_ids, book_ids, top_k, max_basket, min_score):
+    """
+    Same result as the NumPy version, one Counter per book, for installs
+    without NumPy and small libraries
+    """
+    baskets = defaultdict(set)
+    for user_id, book_id in zip(user_ids, book_ids):
+        baskets[user_id].add(book_id)
+
+    pair_counts = defaultdict(Counter)
+    for basket in baskets.values():
+        if not 1 < len(basket) <= max_basket:
+            continue
+        for book_id in basket:
+            counter = pair_counts[book_id]
+            for other_id in basket:
+                if other_id != book_id:
+                    counter[other_id] += 1
+
+    for book_id in sorted(pair_counts):
+        ranked = sorted(
+            (item for item in pair_counts[book_id].items() if item[1] >= min_score),
+            key=lambda item: (-item[1], item[0]),
+        )
+        for rank, (neighbor_id, count) in enumerate(ranked[:top_k]):
+            yield book_id, neighbor_id, rank, count
+
+
+def co_borrow_neighbors(user_ids, book_ids, top_k, max_basket, min_score):
+    """
+    (book_id, neighbor_id, rank, score) of the top_k neighbors of every book
+    """
+    if np is not None:
+        return co_borrow_neighbors_numpy(
+            user_ids, book_ids, top_k, max_basket, min_score
+        )
+    return co_borrow_neighbors_python(user_ids, book_ids, top_k, max_basket, min_score)
+
+
+def build_recommendations(top_k=None, max_basket=None, min_score=None, batch_size=5000):
+    """
+    Rebuild BookNeighbor from the whole borrow history
+    - The table is replaced in one transaction, so the related endpoint serves
+      either the old or the new neighbors
+    Returns the number of rows written
+    """
+    if top_k is None:
+        top_k = settings.RECOMMENDATION_TOP_K
+    if max_basket is None:
+        max_basket = settings.RECOMMENDATION_MAX_BASKET
+    if min_score is None:
+        min_score = settings.RECOMMENDATION_MIN_SCORE
+
+    user_ids, book_ids = load_borrow_pairs()
+    rows = co_borrow_neighbors(user_ids, book_ids, top_k, max_basket, min_score)
+
+    written = 0
+    try:
+        with transaction.atomic():
+            BookNeighbor.objects.all().delete()
+            batch = []
+            for book_id, neighbor_id, rank, score in rows:
+                batch.append(
+                    BookNeighbor(
+                        book_id=book_id, neighbor_id=neighbor_id, rank=rank, score=score
+                    )
+                )
+                if len(batch) >= batch_size:
+                    BookNeighbor.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            BookNeighbor.objects.bulk_create(batch)
+            written += len(batch)
+    except Exception as e:
+        logger.error(f"Error building recommendations=> {e}", exc_info=True)
+        raise
+
+    return written
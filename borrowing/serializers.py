@@ -4,4 +4,17 @@ from .models import Borrow
 class BorrowSerializer(serializers.ModelSerializer):
     class Meta:
         model = Borrow
-        fields = ['borrow_id', 'user', 'book', 'borrow_date', 'due_date', 'return_date']
\ No newline at end of file
+        fields = ['borrow_id', 'user', 'book', 'borrow_date', 'due_date', 'return_date']
+
+
+class BorrowHistorySerializer(serializers.Serializer):
+    """
+    Read only serializer for rows of borrow_history(), live or archived
+    """
+
+    borrow_id = serializers.UUIDField()
+    user = serializers.IntegerField(source="user_id")
+    book = serializers.IntegerField(source="book_id")
+    borrow_date = serializers.DateField()
+    due_date = serializers.DateField()
+    return_date = serializers.DateField(allow_null=True)
@@ -0,0 +1,169 @@
+import logging
+import random
+import time
+from datetime import date, timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+
+from library.models import BookCopy, copy_inventory_enabled
+from library_management.metrics import BORROW_REJECTIONS, LOCK_WAIT
+from user.models import MAX_ACTIVE_BORROWS, CustomUser
+
+from .models import LENDING_PERIOD_DAYS, Borrow
+from .summary import invalidate_user_summary
+from .tasks import apply_return_penalty
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE codes for serialization failure and deadlock
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+# SQLite's "database is locked" is left out: it is raised once the busy
+# timeout ran out, and another attempt would wait the whole timeout again
+RETRYABLE_MESSAGES = ("deadlock", "could not serialize")
+
+
+class BorrowError(Exception):
+    """
+    A borrow or return refused by a business rule, the message is safe to show
+    """
+
+
+class BookUnavailable(BorrowError):
+    pass
+
+
+class BorrowLimitReached(BorrowError):
+    pass
+
+
+class BorrowNotFound(BorrowError):
+    pass
+
+
+def is_retryable(error):
+    """
+    True for deadlocks and serialization failures
+    """
+    cause = error.__cause__
+    sqlstate = getattr(cause, "sqlstate", None) or getattr(cause, "pgcode", None)
+    if sqlstate in RETRYABLE_SQLSTATES:
+        return True
+    return any(message in str(error).lower() for message in RETRYABLE_MESSAGES)
+
+
+def retry_on_conflict(func):
+    """
+    Run a transactional function again when the database reports a conflict
+    - Exponential backoff with full jitter, DB_CONFLICT_RETRIES attempts at most
+    - Never retries inside an outer transaction, which is already broken by then
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = settings.DB_CONFLICT_RETRIES
+        for attempt in range(1, attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if (
+                    attempt == attempts
+                    or connection.in_atomic_block
+                    or not is_retryable(e)
+                ):
+                    raise
+                delay = random.uniform(0, settings.DB_CONFLICT_BACKOFF * 2**attempt)
+                logger.warning(
+                    f"Retrying {func.__name__} after conflict (attempt {attempt})=> {e}"
+                )
+                time.sleep(delay)
+
+    return wrapper
+
+
+@retry_on_conflict
+def borrow_book(user, book):
+    """
+    Borrow a copy of the book for the user
+    - The copy and the user's borrow slot are taken with guarded UPDATEs, so the
+      3 book limit and available copies hold across processes and nodes even
+      where select_for_update does nothing (SQLite)
+    - Database check constraints back both rules up
+    - With INVENTORY_MODE "copies" a free BookCopy row is claimed instead of
+      decrementing the book's counter, so borrowers of one title don't queue
+      on the Book row
+    """
+    copy_id = None
+    # Timed from before BEGIN: with SQLite's IMMEDIATE transactions the write
+    # lock is taken there, on other databases at the guarded update
+    started = time.perf_counter()
+    with transaction.atomic():
+        if copy_inventory_enabled():
+            copy_id = BookCopy.objects.claim(book.pk)
+            taken = copy_id is not None
+        else:
+            taken = book.decrement_copies()
+        LOCK_WAIT.observe(time.perf_counter() - started, operation="borrow")
+
+        if not taken:
+            BORROW_REJECTIONS.inc(reason="book_unavailable")
+            raise BookUnavailable("Book  is not available")
+
+        claimed = CustomUser.objects.filter(
+            pk=user.pk, active_borrow_count__lt=MAX_ACTIVE_BORROWS
+        ).update(active_borrow_count=F("active_borrow_count") + 1)
+
+        if not claimed:
+            BORROW_REJECTIONS.inc(reason="borrow_limit")
+            raise BorrowLimitReached(
+                f"You can't borrow more than {MAX_ACTIVE_BORROWS} books"
+            )
+
+        borrow = Borrow.objects.create(
+            user=user,
+            book=book,
+            due_date=date.today() + timedelta(days=LENDING_PERIOD_DAYS),
+            copy_id=copy_id,
+        )
+        invalidate_user_summary(user.pk)
+
+    return borrow
+
+
+@retry_on_conflict
+def return_book(user, borrow_id):
+    """
+    Return an open borrow of the user
+    - Only one of several concurrent returns of the same borrow can set return_date
+    - Overdue returns queue a task that adds 1 penalty point per day late,
+      keeping the penalty write out of the transaction
+    """
+    started = time.perf_counter()
+    with transaction.atomic():
+        returned = Borrow.objects.filter(
+            borrow_id=borrow_id, user=user, return_date__isnull=True
+        ).update(return_date=date.today())
+        LOCK_WAIT.observe(time.perf_counter() - started, operation="return")
+
+        if not returned:
+            raise BorrowNotFound("Invalid borrow record or book already returned")
+
+        borrow = Borrow.objects.select_related("book").get(borrow_id=borrow_id)
+        if borrow.copy_id is not None:
+            BookCopy.objects.release(borrow.copy_id)
+        if not copy_inventory_enabled():
+            borrow.book.increment_copies()
+        elif borrow.copy_id is None:
+            BookCopy.objects.release_any(borrow.book_id)
+
+        CustomUser.objects.filter(pk=user.pk, active_borrow_count__gt=0).update(
+            active_borrow_count=F("active_borrow_count") - 1
+        )
+        if borrow.is_overdue():
+            # Written in this transaction so a crash after the commit can't lose it
+            apply_return_penalty.enqueue(args=[borrow_id], on_commit=False)
+        invalidate_user_summary(user.pk)
+
+    return borrow
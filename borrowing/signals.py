@@ -0,0 +1,30 @@
+from django.db.models import F
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from user.models import CustomUser
+
+from .models import Borrow
+from .summary import invalidate_user_summary
+
+
+@receiver(pre_delete, sender=Borrow)
+def release_borrow_slot(sender, instance, **kwargs):
+    """
+    Give the user's borrow slot back when an open borrow is deleted, directly
+    or through the cascade of a deleted book
+    """
+    # Returned borrows gave their slot back already, and bulk deletes such as
+    # the archive only remove returned ones
+    if instance.return_date is not None:
+        return
+
+    # The open check runs on the stored row, the instance may be out of date
+    released = CustomUser.objects.filter(
+        pk=instance.user_id,
+        active_borrow_count__gt=0,
+        borrows__pk=instance.pk,
+        borrows__return_date__isnull=True,
+    ).update(active_borrow_count=F("active_borrow_count") - 1)
+    if released:
+        invalidate_user_summary(instance.user_id)
@@ -0,0 +1,102 @@
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from user.models import MAX_ACTIVE_BORROWS, CustomUser
+
+from .models import Borrow
+
+logger = logging.getLogger(__name__)
+
+
+def summary_cache_key(user_id):
+    return f"user-summary:{user_id}"
+
+
+def load_user_summary(user):
+    """
+    Build the cacheable part of the summary with a single query
+    on the open borrows index
+    """
+    active_borrows = [
+        {
+            "borrow_id": str(row["borrow_id"]),
+            "book_id": row["book_id"],
+            "title": row["book__title"],
+            "due_date": row["due_date"].isoformat(),
+        }
+        for row in Borrow.objects.filter(user_id=user.pk, return_date__isnull=True)
+        .order_by("due_date")
+        .values("borrow_id", "book_id", "book__title", "due_date")
+    ]
+
+    return {
+        "user_id": user.pk,
+        "username": user.username,
+        "active_borrows": active_borrows,
+    }
+
+
+def current_penalty_points(user):
+    """
+    Penalty points change in the task worker, whose cache invalidation never
+    reaches the web processes with a per process cache, so they are not cached
+    - A user built from token claims may carry stale points, they are read
+      from the database instead
+    """
+    if getattr(user, "from_token_claims", False):
+        return (
+            CustomUser.objects.filter(pk=user.pk)
+            .values_list("penalty_points", flat=True)
+            .first()
+        )
+    return user.penalty_points
+
+
+def get_user_summary(user):
+    """
+    Return the dashboard summary of a user
+    - Borrows come from the per user cache, penalty points are read fresh
+    - Overdue flags are worked out on every call so a cached entry never goes stale at midnight
+    """
+    key = summary_cache_key(user.pk)
+    summary = cache.get(key)
+
+    if summary is None:
+        summary = load_user_summary(user)
+        cache.set(key, summary, settings.USER_SUMMARY_CACHE_TTL)
+
+    today = date.today().isoformat()
+    active_borrows = [
+        {**borrow, "is_overdue": today > borrow["due_date"]}
+        for borrow in summary["active_borrows"]
+    ]
+    active_count = len(active_borrows)
+
+    return {
+        "user_id": summary["user_id"],
+        "username": summary["username"],
+        "penalty_points": current_penalty_points(user),
+        "active_borrows": active_borrows,
+        "active_borrow_count": active_count,
+        "overdue_count": sum(borrow["is_overdue"] for borrow in active_borrows),
+        "remaining_borrow_slots": max(MAX_ACTIVE_BORROWS - active_count, 0),
+    }
+
+
+def invalidate_user_summary(*user_ids):
+    """
+    Drop cached summaries once the surrounding transaction commits
+    - Call this on every borrow and return
+    """
+
+    def delete():
+        try:
+            cache.delete_many([summary_cache_key(user_id) for user_id in user_ids])
+        except Exception as e:
+            logger.error(f"Error invalidating user summary=> {e}", exc_info=True)
+
+    transaction.on_commit(delete)
@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models import F
+
+from taskqueue.queue import task
+from user.models import CustomUser
+
+from .models import Borrow
+
+
+@task
+def apply_return_penalty(borrow_id):
+    """
+    Add the penalty points of a late return to the user
+    - penalty_applied makes a retried or duplicated task add them only once
+    """
+    with transaction.atomic():
+        applied = Borrow.objects.filter(
+            borrow_id=borrow_id, return_date__isnull=False, penalty_applied=False
+        ).update(penalty_applied=True)
+        if not applied:
+            return
+
+        borrow = Borrow.objects.get(borrow_id=borrow_id)
+        CustomUser.objects.filter(pk=borrow.user_id).update(
+            penalty_points=F("penalty_points") + borrow.penalty_points()
+        )
@@ -1,3 +1,495 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from uuid import uuid4
 
-# Create your tests here.
+from django.contrib.auth.models import Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from library.choices import CategoryChoice
+from library.inventory import reconcile_batch
+from library.models import Author, Book, BookCopy, BookNeighbor, Category
+from taskqueue.models import Task
+from taskqueue.worker import claim_tasks, run_task
+from user.models import MAX_ACTIVE_BORROWS, CustomUser
+
+from . import views
+from .archive import archive_batch
+from .models import Borrow, BorrowArchive, IdempotencyKey
+from .recommendations import build_recommendations
+from .services import (
+    BookUnavailable,
+    BorrowLimitReached,
+    BorrowNotFound,
+    borrow_book,
+    retry_on_conflict,
+    return_book,
+)
+
+
+def create_book(title="Book", copies=5):
+    author, _ = Author.objects.get_or_create(name="Author", bio="")
+    category, _ = Category.objects.get_or_create(name=CategoryChoice.FICTION)
+    return Book.objects.create(
+        title=title,
+        description="",
+        author=author,
+        category=category,
+        total_copies=copies,
+        available_copies=copies,
+    )
+
+
+class BorrowServiceTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="reader", password="x")
+        self.book = create_book()
+
+    def test_borrow_takes_a_copy_and_a_slot(self):
+        borrow = borrow_book(self.user, self.book)
+
+        self.book.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 4)
+        self.assertEqual(self.user.active_borrow_count, 1)
+        self.assertIsNone(borrow.return_date)
+
+    def test_borrow_limit(self):
+        for number in range(MAX_ACTIVE_BORROWS):
+            borrow_book(self.user, create_book(f"Book {number}"))
+
+        with self.assertRaises(BorrowLimitReached):
+            borrow_book(self.user, self.book)
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 5)
+
+    def test_unavailable_book(self):
+        book = create_book("Last copy", copies=1)
+        borrow_book(self.user, book)
+        other = CustomUser.objects.create_user(username="other", password="x")
+
+        with self.assertRaises(BookUnavailable):
+            borrow_book(other, book)
+
+    def test_return_gives_copy_and_slot_back(self):
+        borrow = borrow_book(self.user, self.book)
+        return_book(self.user, borrow.borrow_id)
+
+        self.book.refresh_from_db()
+        self.user.refresh_from_db()
+        borrow.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 5)
+        self.assertEqual(self.user.active_borrow_count, 0)
+        self.assertEqual(borrow.return_date, date.today())
+
+        with self.assertRaises(BorrowNotFound):
+            return_book(self.user, borrow.borrow_id)
+
+    def test_late_return_queues_penalty(self):
+        borrow = borrow_book(self.user, self.book)
+        Borrow.objects.filter(pk=borrow.pk).update(
+            due_date=date.today() - timedelta(days=2)
+        )
+
+        return_book(self.user, borrow.borrow_id)
+
+        task = Task.objects.get()
+        self.assertEqual(task.args, [str(borrow.borrow_id)])
+
+    def test_return_with_stale_count(self):
+        borrow = Borrow.objects.create(
+            user=self.user, book=self.book, due_date=date.today()
+        )
+
+        return_book(self.user, borrow.borrow_id)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_borrow_count, 0)
+
+
+class BorrowCountTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="reader", password="x")
+
+    def test_deleting_a_book_frees_borrow_slots(self):
+        book = create_book("Withdrawn")
+        for _ in range(MAX_ACTIVE_BORROWS):
+            borrow_book(self.user, book)
+
+        book.delete()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_borrow_count, 0)
+        borrow_book(self.user, create_book("Next"))
+
+    def test_deleting_a_returned_borrow_keeps_the_count(self):
+        book = create_book()
+        returned = borrow_book(self.user, book)
+        return_book(self.user, returned.borrow_id)
+        borrow_book(self.user, book)
+
+        returned.delete()
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_borrow_count, 1)
+
+    def test_repair_borrow_counts(self):
+        book = create_book()
+        borrow_book(self.user, book)
+        CustomUser.objects.filter(pk=self.user.pk).update(active_borrow_count=3)
+        Book.objects.filter(pk=book.pk).update(available_copies=1)
+
+        call_command("repair_borrow_counts", "--dry-run", stdout=StringIO())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.active_borrow_count, 3)
+
+        call_command("repair_borrow_counts", stdout=StringIO())
+        self.user.refresh_from_db()
+        book.refresh_from_db()
+        self.assertEqual(self.user.active_borrow_count, 1)
+        self.assertEqual(book.available_copies, 4)
+
+
+class BorrowAdminTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="reader", password="x")
+        self.book = create_book(copies=2)
+        self.borrow = borrow_book(self.user, self.book)
+
+    def run_action(self, staff):
+        self.client.force_login(staff)
+        return self.client.post(
+            "/admin/borrowing/borrow/",
+            {"action": "mark_returned", "_selected_action": [self.borrow.pk]},
+        )
+
+    def test_mark_returned(self):
+        admin = CustomUser.objects.create_superuser(username="admin", password="x")
+
+        self.run_action(admin)
+
+        self.borrow.refresh_from_db()
+        self.book.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(self.borrow.return_date, date.today())
+        self.assertEqual(self.book.available_copies, 2)
+        self.assertEqual(self.user.active_borrow_count, 0)
+
+    def test_mark_returned_needs_change_permission(self):
+        staff = CustomUser.objects.create_user(
+            username="staff", password="x", is_staff=True
+        )
+        staff.user_permissions.add(Permission.objects.get(codename="view_borrow"))
+
+        self.run_action(staff)
+
+        self.borrow.refresh_from_db()
+        self.assertIsNone(self.borrow.return_date)
+        response = self.client.get("/admin/borrowing/borrow/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "mark_returned")
+
+    def test_mark_returned_keeps_available_within_total(self):
+        admin = CustomUser.objects.create_superuser(username="admin", password="x")
+        # A counter that drifted, every copy already shows as free
+        Book.objects.filter(pk=self.book.pk).update(available_copies=2)
+
+        self.run_action(admin)
+
+        self.borrow.refresh_from_db()
+        self.book.refresh_from_db()
+        self.assertEqual(self.borrow.return_date, date.today())
+        self.assertEqual(self.book.available_copies, 2)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="reader", password="x")
+        self.book = create_book()
+
+    def returned_borrow(self, days_late):
+        borrow = borrow_book(self.user, self.book)
+        Borrow.objects.filter(pk=borrow.pk).update(
+            due_date=date.today() - timedelta(days=days_late)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return_book(self.user, borrow.borrow_id)
+        return borrow
+
+    def test_late_return_waits_for_its_penalty(self):
+        on_time = self.returned_borrow(days_late=0)
+        late = self.returned_borrow(days_late=3)
+        tomorrow = date.today() + timedelta(days=1)
+
+        self.assertEqual(archive_batch(tomorrow, 100), 1)
+        self.assertTrue(BorrowArchive.objects.filter(pk=on_time.pk).exists())
+        self.assertTrue(Borrow.objects.filter(pk=late.pk).exists())
+
+        for task in claim_tasks(10):
+            run_task(task)
+        self.assertEqual(archive_batch(tomorrow, 100), 1)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.penalty_points, 3)
+        self.assertTrue(BorrowArchive.objects.filter(pk=late.pk).exists())
+
+
+class BorrowHistoryTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="reader", password="x")
+        self.client.force_authenticate(self.user)
+        book = create_book()
+        today = date.today()
+        Borrow.objects.bulk_create(
+            [
+                Borrow(
+                    user=self.user,
+                    book=book,
+                    due_date=today,
+                    return_date=today,
+                )
+                for _ in range(55)
+            ]
+        )
+        BorrowArchive.objects.create(
+            borrow_id=uuid4(),
+            user_id=self.user.pk,
+            book_id=book.pk,
+            borrow_date=today - timedelta(days=400),
+            due_date=today - timedelta(days=386),
+            return_date=today - timedelta(days=390),
+        )
+
+    def test_default_page(self):
+        response = self.client.get("/api/borrow/history/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 56)
+        self.assertEqual(len(response.data["results"]), 50)
+        self.assertIsNotNone(response.data["next"])
+
+    def test_limit_and_offset(self):
+        response = self.client.get("/api/borrow/history/?limit=10&offset=50")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 6)
+        self.assertIsNone(response.data["next"])
+
+    def test_only_own_history(self):
+        other = CustomUser.objects.create_user(username="other", password="x")
+        self.client.force_authenticate(other)
+
+        response = self.client.get("/api/borrow/history/")
+
+        self.assertEqual(response.data["count"], 0)
+
+
+class UserSummaryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username="reader", password="x")
+        self.client.force_authenticate(self.user)
+
+    def test_penalty_from_task_shows_up_at_once(self):
+        borrow = borrow_book(self.user, create_book())
+        Borrow.objects.filter(pk=borrow.pk).update(
+            due_date=date.today() - timedelta(days=3)
+        )
+        self.assertEqual(self.client.get("/api/me/summary/").data["overdue_count"], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            return_book(self.user, borrow.borrow_id)
+        for task in claim_tasks(10):
+            run_task(task)
+
+        # A new request loads the user again
+        self.client.force_authenticate(CustomUser.objects.get(pk=self.user.pk))
+        summary = self.client.get("/api/me/summary/").data
+        self.assertEqual(summary["penalty_points"], 3)
+        self.assertEqual(summary["active_borrow_count"], 0)
+
+
+class BuildRecommendationsTests(TestCase):
+    def setUp(self):
+        first, second = create_book("First"), create_book("Second")
+        for number in range(2):
+            user = CustomUser.objects.create_user(username=f"reader{number}")
+            borrow_book(user, first)
+            borrow_book(user, second)
+
+    def test_neighbors_of_both_books(self):
+        self.assertEqual(build_recommendations(), 2)
+        self.assertEqual(set(BookNeighbor.objects.values_list("score", flat=True)), {2})
+
+    def test_zero_is_not_the_default(self):
+        build_recommendations()
+
+        self.assertEqual(build_recommendations(top_k=0), 0)
+        self.assertFalse(BookNeighbor.objects.exists())
+
+
+class CopyInventoryTests(TestCase):
+    def setUp(self):
+        self.book = create_book(copies=3)
+
+    def free_copies(self):
+        return BookCopy.objects.filter(book=self.book, is_available=True).count()
+
+    def test_switch_after_counter_borrows(self):
+        reconcile_batch([self.book], derive=False)
+        readers = [
+            CustomUser.objects.create_user(username=f"reader{number}")
+            for number in range(4)
+        ]
+        legacy = [borrow_book(reader, self.book) for reader in readers[:2]]
+
+        with override_settings(INVENTORY_MODE="copies"):
+            reconcile_batch([Book.objects.get(pk=self.book.pk)])
+            self.assertEqual(self.free_copies(), 1)
+
+            borrow_book(readers[2], self.book)
+            with self.assertRaises(BookUnavailable):
+                borrow_book(readers[3], self.book)
+
+            return_book(readers[0], legacy[0].borrow_id)
+            self.assertEqual(self.free_copies(), 1)
+            borrow_book(readers[3], self.book)
+
+        self.assertEqual(Borrow.objects.open().filter(book=self.book).count(), 3)
+
+    def test_copies_held_by_borrows_stay_taken(self):
+        reader = CustomUser.objects.create_user(username="reader")
+        with override_settings(INVENTORY_MODE="copies"):
+            reconcile_batch([self.book])
+            borrow = borrow_book(reader, self.book)
+            BookCopy.objects.filter(book=self.book).update(is_available=True)
+
+            changed = reconcile_batch([Book.objects.get(pk=self.book.pk)])
+
+        self.assertEqual(changed, 1)
+        self.assertFalse(BookCopy.objects.get(pk=borrow.copy_id).is_available)
+        self.assertEqual(self.free_copies(), 2)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 2)
+
+    def test_copy_rows_follow_total_copies(self):
+        reconcile_batch([self.book], derive=False)
+        Book.objects.filter(pk=self.book.pk).update(total_copies=2, available_copies=2)
+
+        reconcile_batch([Book.objects.get(pk=self.book.pk)], derive=False)
+
+        self.assertEqual(BookCopy.objects.filter(book=self.book).count(), 2)
+
+
+@override_settings(DB_CONFLICT_RETRIES=3, DB_CONFLICT_BACKOFF=0)
+class RetryOnConflictTests(SimpleTestCase):
+    def failing(self, message):
+        calls = []
+
+        @retry_on_conflict
+        def write():
+            calls.append(message)
+            raise OperationalError(message)
+
+        with self.assertRaises(OperationalError):
+            write()
+        return len(calls)
+
+    def test_deadlock_is_retried(self):
+        self.assertEqual(self.failing("deadlock detected"), 3)
+
+    def test_busy_timeout_is_not_retried(self):
+        self.assertEqual(self.failing("database is locked"), 1)
+
+
+class IdempotencyTests(APITestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username="reader", password="x")
+        self.client.force_authenticate(self.user)
+        self.book = create_book()
+
+    def borrow(self, key="key-1", book_id=None):
+        return self.client.post(
+            "/api/borrow/",
+            {"book_id": book_id or self.book.pk},
+            format="json",
+            headers={"Idempotency-Key": key},
+        )
+
+    def in_progress_key(self, started):
+        response = self.borrow()
+        IdempotencyKey.objects.update(
+            status_code=None, response_body=None, created_at=started
+        )
+        Borrow.objects.all().delete()
+        return response
+
+    def test_replay(self):
+        first = self.borrow()
+        second = self.borrow()
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(Borrow.objects.count(), 1)
+
+    def test_duplicate_while_in_progress(self):
+        self.in_progress_key(timezone.now())
+
+        response = self.borrow()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Borrow.objects.exists())
+
+    def test_other_body_with_the_same_key(self):
+        self.borrow()
+
+        response = self.borrow(book_id=create_book("Other").pk)
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Borrow.objects.count(), 1)
+
+    @override_settings(IDEMPOTENCY_LOCK_TIMEOUT=60)
+    def test_abandoned_key_is_taken_over(self):
+        self.in_progress_key(timezone.now() - timedelta(seconds=61))
+
+        response = self.borrow()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Borrow.objects.count(), 1)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+    def test_borrow_rolled_back_when_the_key_was_taken_over(self):
+        def borrow_then_lose_key(user, book):
+            borrow = borrow_book(user, book)
+            IdempotencyKey.objects.update(created_at=timezone.now() + timedelta(1))
+            return borrow
+
+        with mock.patch.object(views, "borrow_book", borrow_then_lose_key):
+            response = self.borrow()
+
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Borrow.objects.exists())
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, 5)
+
+    def test_server_error_rolls_back_and_releases_the_key(self):
+        def borrow_then_fail(user, book):
+            borrow_book(user, book)
+            raise RuntimeError("response lost")
+
+        with mock.patch.object(views, "borrow_book", borrow_then_fail):
+            response = self.borrow()
+
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(Borrow.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.borrow().status_code, 201)
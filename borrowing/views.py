@@ -1,10 +1,9 @@
 import logging
 import uuid
-from datetime import date, timedelta
 
-from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import status
+from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -12,21 +11,33 @@ from rest_framework.views import APIView
 from library.models import Book
 from user.models import CustomUser
 
+from .archive import borrow_history
+from .idempotency import idempotent
 from .models import Borrow
-from .serializers import BorrowSerializer
+from .serializers import BorrowHistorySerializer, BorrowSerializer
+from .services import BorrowError, borrow_book, return_book
+from .summary import get_user_summary
 
 logger = logging.getLogger(__name__)
 
 
+class BorrowHistoryPagination(LimitOffsetPagination):
+    default_limit = 50
+    max_limit = 500
+
+
 class BorrowView(APIView):
     """
     API endpoint to borrow a book
     - Users can borrow at max 3 books at a time
-    - Locks the book record to avoid race condition
+    - Copies and borrow slots are taken with guarded updates, so the limits
+      hold with several app servers on one database
+    - Retries with the same Idempotency-Key header get the first response back
     """
 
     permission_classes = [IsAuthenticated]
 
+    @idempotent("borrow")
     def post(self, request):
         try:
             if "book_id" not in request.data:
@@ -34,35 +45,17 @@ class BorrowView(APIView):
                     {"details": "Book id is needed"}, status=status.HTTP_400_BAD_REQUEST
                 )
             book_id = request.data.get("book_id")
-            user = request.user
-
-            with transaction.atomic():
-                book = get_object_or_404(Book.objects.select_for_update(), pk=book_id)
-
-                if not book.is_available():
-                    return Response(
-                        {"details": "Book  is not available"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-                if (
-                    Borrow.objects.filter(user=user, return_date__isnull=True).count()
-                    >= 3
-                ):
-                    return Response(
-                        {"details": "You can't borrow more than 3 books"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                Borrow.objects.create(
-                    user=user, book=book, due_date=date.today() + timedelta(days=14)
-                )
+            book = get_object_or_404(Book, pk=book_id)
 
-                book.decrement_copies()
+            try:
+                borrow_book(request.user, book)
+            except BorrowError as e:
+                return Response({"details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-                return Response(
-                    {"details": "Borrowing book is successful"},
-                    status=status.HTTP_201_CREATED,
-                )
+            return Response(
+                {"details": "Borrowing book is successful"},
+                status=status.HTTP_201_CREATED,
+            )
         except Exception as e:
             logger.error(f"Error in borrowing book=> {e}", exc_info=True)
             return Response(
@@ -87,10 +80,47 @@ class BorrowView(APIView):
             )
 
 
+class BorrowHistoryView(APIView):
+    """
+    API endpoint for the full borrowing history, live and archived
+    - Users see their own history
+    - Staff can pass ?user=<id> to see any user's history, or omit it for everyone
+    - Paginated with ?limit= (50 by default, 500 at most) and ?offset=
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            user_id = request.user.pk
+            if request.user.is_staff:
+                user_id = request.query_params.get("user")
+                if user_id is not None and not user_id.isdigit():
+                    return Response(
+                        {"details": "Invalid user id"},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+
+            paginator = BorrowHistoryPagination()
+            page = paginator.paginate_queryset(
+                borrow_history(user_id), request, view=self
+            )
+            serializer = BorrowHistorySerializer(page, many=True)
+
+            return paginator.get_paginated_response(serializer.data)
+        except Exception as e:
+            logger.error(f"Error retrieving borrow history=> {e}", exc_info=True)
+            return Response(
+                {"details": "An error occure while retrieving borrow history"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 class ReturnBookViewset(APIView):
     """
     API endpoint for returning borrowd book
-    - Update penalty points if the book is overdue
+    - Overdue returns queue a background task that adds the penalty points
+    - Retries with the same Idempotency-Key header get the first response back
     """
 
     permission_classes = [IsAuthenticated]
@@ -102,6 +132,7 @@ class ReturnBookViewset(APIView):
         except ValueError:
             return False
 
+    @idempotent("return")
     def post(self, request):
         try:
             if "borrow_id" not in request.data:
@@ -117,34 +148,14 @@ class ReturnBookViewset(APIView):
                     {"details": "Invalid borrow_id. Need valid UUID"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            user = request.user
-
-            with transaction.atomic():
-                try:
-                    borrow = (
-                        Borrow.objects.select_related("book")
-                        .select_for_update()
-                        .get(borrow_id=borrow_id, user=user, return_date__isnull=True)
-                    )
-                except Borrow.DoesNotExist:
-                    return Response(
-                        {"details": "Invalid borrow record or book already returned"},
-                        status=status.HTTP_400_BAD_REQUEST,
-                    )
-
-                borrow.return_date = date.today()
-                borrow.save(update_fields=["return_date"])
-
-                borrow.book.increment_copies()
-
-                if borrow.is_overdue():
-                    penalty_points = borrow.days_late()
-                    user.penalty_points += penalty_points
-                    user.save(update_fields=["penalty_points"])
+            try:
+                return_book(request.user, borrow_id)
+            except BorrowError as e:
+                return Response({"details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-                return Response(
-                    {"details": "Book returns successfully"}, status=status.HTTP_200_OK
-                )
+            return Response(
+                {"details": "Book returns successfully"}, status=status.HTTP_200_OK
+            )
         except Exception as e:
             logger.error(f"Error in returning book=> {e}", exc_info=True)
             return Response(
@@ -190,3 +201,23 @@ class UserPenaltyPointsView(APIView):
                 {"details": "An error occure while retrieving penalty points"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class UserSummaryView(APIView):
+    """
+    API endpoint for the member home screen of the authenticated user
+    - Active borrows with due dates, overdue count, penalty points and remaining borrow slots
+    - Borrows are served from a per user cache that is dropped on borrow and return
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            return Response(get_user_summary(request.user), status=status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f"Error retrieving user summary=> {e}", exc_info=True)
+            return Response(
+                {"details": "An error occure while retrieving user summary"},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
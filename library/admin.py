@@ -1,6 +1,106 @@
-from django.contrib import admin
-from .models import Category, Author, Book
+from django.contrib import admin, messages
+from django.db import transaction
+from django.db.models import Exists, F, Min, OuterRef
+from django.db.models.functions import Greatest
 
-admin.site.register(Category)
-admin.site.register(Author)
-admin.site.register(Book)
+from library_management.paginators import EstimatedCountPaginator
+
+from .models import Author, Book, BookCopy, Category, copy_inventory_enabled
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ["id", "name"]
+    search_fields = ["name"]
+
+
+@admin.register(Author)
+class AuthorAdmin(admin.ModelAdmin):
+    list_display = ["id", "name"]
+    search_fields = ["name"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(Book)
+class BookAdmin(admin.ModelAdmin):
+    """
+    - Author and category are joined in the changelist query and picked by autocomplete
+    - Copy adjustment actions run as one UPDATE over the selection and add or
+      remove one BookCopy row per book, so copy inventory stays in step
+    """
+
+    list_display = [
+        "title",
+        "author",
+        "category",
+        "total_copies",
+        "available_copies",
+    ]
+    list_select_related = ["author", "category"]
+    list_filter = ["category"]
+    search_fields = ["title", "author__name"]
+    autocomplete_fields = ["author", "category"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["add_one_copy", "remove_one_available_copy"]
+
+    @admin.action(description="Add one copy to selected books")
+    def add_one_copy(self, request, queryset):
+        with transaction.atomic():
+            book_ids = list(queryset.values_list("pk", flat=True))
+            updated = Book.objects.filter(pk__in=book_ids).update(
+                total_copies=F("total_copies") + 1,
+                available_copies=F("available_copies") + 1,
+            )
+            BookCopy.objects.bulk_create(
+                [BookCopy(book_id=book_id) for book_id in book_ids]
+            )
+        self.message_user(request, f"Added one copy to {updated} books")
+
+    @admin.action(description="Remove one available copy from selected books")
+    def remove_one_available_copy(self, request, queryset):
+        selected = queryset.count()
+        with transaction.atomic():
+            candidates = queryset.filter(total_copies__gt=1)
+            if copy_inventory_enabled():
+                candidates = candidates.filter(
+                    Exists(
+                        BookCopy.objects.filter(book=OuterRef("pk"), is_available=True)
+                    )
+                )
+            else:
+                candidates = candidates.filter(available_copies__gt=0)
+            book_ids = list(candidates.values_list("pk", flat=True))
+
+            updated = Book.objects.filter(pk__in=book_ids).update(
+                total_copies=F("total_copies") - 1,
+                available_copies=Greatest(F("available_copies") - 1, 0),
+            )
+            free_copies = (
+                BookCopy.objects.filter(book_id__in=book_ids, is_available=True)
+                .values("book_id")
+                .annotate(first=Min("pk"))
+                .values_list("first", flat=True)
+                .order_by()
+            )
+            BookCopy.objects.filter(pk__in=list(free_copies)).delete()
+        self.message_user(request, f"Removed one copy from {updated} books")
+
+        if updated < selected:
+            self.message_user(
+                request,
+                f"{selected - updated} books were skipped because they have no available copy to remove",
+                level=messages.WARNING,
+            )
+
+
+@admin.register(BookCopy)
+class BookCopyAdmin(admin.ModelAdmin):
+    list_display = ["id", "book", "is_available", "created_at"]
+    list_select_related = ["book__author"]
+    list_filter = ["is_available"]
+    search_fields = ["book__title"]
+    autocomplete_fields = ["book"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,10 +1,82 @@
 import django_filters
-from .models import Book
+from django.db.models import Count, Q
+
+from .models import Author, AuthorTrigram, Book
+from .search import TRIGRAM_SIZE, resolve_categories, split_terms, trigrams
+from .snapshot import get_catalog_snapshot
+
+
+def author_ids_matching(term):
+    """
+    Subquery of ids of authors whose normalized name contains the term
+    - Terms shorter than a trigram check the substring on every name
+    - Longer terms find candidates holding every trigram of the term through
+      the trigram index, then check the few candidates for the exact substring
+    """
+    if len(term) < TRIGRAM_SIZE:
+        return Author.objects.filter(name_normalized__contains=term).values("id")
+
+    term_trigrams = trigrams(term)
+    candidates = (
+        AuthorTrigram.objects.filter(trigram__in=term_trigrams)
+        .values("author_id")
+        .annotate(matches=Count("trigram"))
+        .filter(matches=len(term_trigrams))
+        .values("author_id")
+    )
+    return Author.objects.filter(
+        id__in=candidates, name_normalized__contains=term
+    ).values("id")
+
 
 class BookFilter(django_filters.FilterSet):
-    author = django_filters.CharFilter(field_name="author__name", lookup_expr="icontains")
-    category = django_filters.CharFilter(field_name="category__name", lookup_expr="icontains")
+    """
+    Book list filters, every one of them backed by an index
+    - author, category: comma separated, a book matches any of the values
+    - available: true for books with a free copy, false for books without
+    - min_copies, max_copies: range of total copies
+    """
+
+    author = django_filters.CharFilter(method="filter_author")
+    category = django_filters.CharFilter(method="filter_category")
+    available = django_filters.BooleanFilter(method="filter_available")
+    min_copies = django_filters.NumberFilter(
+        field_name="total_copies", lookup_expr="gte"
+    )
+    max_copies = django_filters.NumberFilter(
+        field_name="total_copies", lookup_expr="lte"
+    )
 
     class Meta:
         model = Book
-        fields = ["author", "category"]
+        fields = ["author", "category", "available", "min_copies", "max_copies"]
+
+    def filter_author(self, queryset, name, value):
+        condition = Q()
+        for term in split_terms(value):
+            condition |= Q(author_id__in=author_ids_matching(term))
+
+        if not condition:
+            return queryset
+        return queryset.filter(condition)
+
+    def filter_category(self, queryset, name, value):
+        terms = split_terms(value)
+        if not terms:
+            return queryset
+
+        category_ids = get_catalog_snapshot().category_map()
+        ids = {
+            category_ids[choice]
+            for term in terms
+            for choice in resolve_categories(term)
+            if choice in category_ids
+        }
+        return queryset.filter(category_id__in=ids)
+
+    def filter_available(self, queryset, name, value):
+        if value is None:
+            return queryset
+        if value:
+            return queryset.filter(available_copies__gt=0)
+        return queryset.filter(available_copies=0)
@@ -0,0 +1,102 @@
+import logging
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import Book, BookCopy
+
+logger = logging.getLogger(__name__)
+
+
+def reconcile_batch(books, derive=True):
+    """
+    Bring the copy rows of a batch of books in line with their open borrows
+    - Every book gets total_copies copy rows, surplus copies no borrow holds
+      are removed
+    - Copies held by an open borrow are taken. Of the other copies, one per
+      open borrow without a copy (made in counter mode) is taken as well and
+      the rest are free, so a book has total_copies minus open borrows free
+      copies in either mode
+    - With `derive` available_copies is set to the number of free copies
+    Returns the number of books whose available_copies changed
+    """
+    Borrow = BookCopy._meta.get_field("borrows").related_model
+    book_ids = [book.pk for book in books]
+
+    changed = []
+    with transaction.atomic():
+        open_borrows = Counter()
+        held = set()
+        for book_id, copy_id in Borrow.objects.filter(
+            book_id__in=book_ids, return_date__isnull=True
+        ).values_list("book_id", "copy_id"):
+            open_borrows[book_id] += 1
+            if copy_id is not None:
+                held.add(copy_id)
+
+        copies = defaultdict(list)
+        for pk, book_id, is_available in (
+            BookCopy.objects.filter(book_id__in=book_ids)
+            .order_by("is_available", "pk")
+            .values_list("pk", "book_id", "is_available")
+        ):
+            copies[book_id].append((pk, is_available))
+
+        new_copies, surplus, take, free = [], [], [], []
+        for book in books:
+            rows = copies[book.pk]
+            # Copies no open borrow holds, taken ones first
+            loose = [row for row in rows if row[0] not in held]
+            held_copies = len(rows) - len(loose)
+            take += [pk for pk, is_available in rows if pk in held and is_available]
+            legacy = max(open_borrows[book.pk] - held_copies, 0)
+            wanted = max(book.total_copies - held_copies, 0)
+
+            surplus += [pk for pk, _ in loose[wanted:]]
+            loose = loose[:wanted]
+            for number, (pk, is_available) in enumerate(loose):
+                taken = number < legacy
+                if taken and is_available:
+                    take.append(pk)
+                elif not taken and not is_available:
+                    free.append(pk)
+            new_copies += [
+                BookCopy(book=book, is_available=number >= legacy)
+                for number in range(len(loose), wanted)
+            ]
+
+            available = max(wanted - legacy, 0)
+            if derive and book.available_copies != available:
+                book.available_copies = available
+                changed.append(book)
+
+        BookCopy.objects.filter(pk__in=surplus).delete()
+        BookCopy.objects.filter(pk__in=take).update(is_available=False)
+        BookCopy.objects.filter(pk__in=free).update(is_available=True)
+        BookCopy.objects.bulk_create(new_copies)
+        Book.objects.bulk_update(changed, ["available_copies"])
+
+    return len(changed)
+
+
+def reconcile_inventory(batch_size=500, derive=True):
+    """
+    Reconcile every book in primary key order, yields (books, changed) per batch
+    """
+    last_pk = 0
+    while True:
+        books = list(
+            Book.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pk", "title", "total_copies", "available_copies")[:batch_size]
+        )
+        if not books:
+            return
+
+        try:
+            changed = reconcile_batch(books, derive=derive)
+        except Exception as e:
+            logger.error(f"Error reconciling inventory=> {e}", exc_info=True)
+            raise
+        last_pk = books[-1].pk
+        yield len(books), changed
@@ -0,0 +1,125 @@
+import random
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.http import QueryDict
+
+from library.choices import CategoryChoice
+from library.filters import BookFilter
+from library.models import Author, AuthorTrigram, Book, Category
+from library.search import normalize_name
+
+QUERIES = [
+    "author=shak",
+    "author=an",
+    "author=shak,mor",
+    "category=fiction",
+    "category=sci,history",
+    "available=true&category=art",
+    "min_copies=5&max_copies=8",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the indexed BookFilter with the old icontains filters on a large "
+        "generated catalog. Everything runs in a rolled back transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--authors", type=int, default=20000)
+        parser.add_argument("--books", type=int, default=200000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        random.seed(7)
+        with transaction.atomic():
+            self.seed(options["authors"], options["books"])
+
+            self.stdout.write(
+                f"{'query':<32} {'rows':>8} {'old ms':>10} {'new ms':>10}"
+            )
+            for query in QUERIES:
+                params = QueryDict(query)
+                old_rows, old_ms = self.measure(
+                    self.old_queryset(params), options["repeat"]
+                )
+                new_rows, new_ms = self.measure(
+                    BookFilter(params, queryset=Book.objects.all()).qs,
+                    options["repeat"],
+                )
+                self.stdout.write(
+                    f"{query:<32} {new_rows:>8} {old_ms:>10.2f} {new_ms:>10.2f}"
+                )
+                if old_rows != new_rows:
+                    self.stdout.write(f"  old filter returned {old_rows} rows")
+
+            transaction.set_rollback(True)
+
+    def seed(self, author_count, book_count, chunk_size=5000):
+        categories = [
+            Category.objects.get_or_create(name=choice)[0] for choice in CategoryChoice
+        ]
+
+        names = set()
+        while len(names) < author_count:
+            names.add(
+                " ".join(
+                    "".join(
+                        random.choices(string.ascii_lowercase, k=random.randint(3, 9))
+                    ).title()
+                    for _ in range(2)
+                )
+            )
+        names.update(["William Shakespeare", "Thomas More"])
+
+        authors = Author.objects.bulk_create(
+            [
+                Author(name=name, name_normalized=normalize_name(name), bio="")
+                for name in names
+            ],
+            batch_size=chunk_size,
+        )
+        for start in range(0, len(authors), chunk_size):
+            AuthorTrigram.rebuild(authors[start : start + chunk_size])
+
+        for start in range(0, book_count, chunk_size):
+            books = []
+            for number in range(start, min(start + chunk_size, book_count)):
+                total = random.randint(1, 10)
+                books.append(
+                    Book(
+                        title=f"bench-book-{number}",
+                        description="",
+                        author=random.choice(authors),
+                        category=random.choice(categories),
+                        total_copies=total,
+                        available_copies=random.randint(0, total),
+                    )
+                )
+            Book.objects.bulk_create(books)
+
+    def old_queryset(self, params):
+        """
+        The filters as they were: icontains scans over the joined names
+        """
+        queryset = Book.objects.all()
+        if "author" in params:
+            queryset = queryset.filter(author__name__icontains=params["author"])
+        if "category" in params:
+            queryset = queryset.filter(category__name__icontains=params["category"])
+        if params.get("available") == "true":
+            queryset = queryset.filter(available_copies__gt=0)
+        if "min_copies" in params:
+            queryset = queryset.filter(total_copies__gte=params["min_copies"])
+        if "max_copies" in params:
+            queryset = queryset.filter(total_copies__lte=params["max_copies"])
+        return queryset
+
+    def measure(self, queryset, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            rows = len(list(queryset.values_list("id", flat=True)))
+        return rows, (time.perf_counter() - started) * 1000 / repeat
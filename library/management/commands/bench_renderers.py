@@ -0,0 +1,112 @@
+import gzip
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from borrowing.serializers import BorrowHistorySerializer
+from library.models import Book
+from library.serializers import BookSerializer
+from library_management.middleware import brotli
+from library_management.renderers import FastJSONRenderer, orjson
+
+
+def book_rows(count):
+    return BookSerializer(
+        [
+            Book(
+                id=number,
+                title=f"Book number {number}",
+                description="A short description of the book " * 3,
+                author_id=number % 500 + 1,
+                category_id=number % 10 + 1,
+                total_copies=5,
+                available_copies=number % 6,
+            )
+            for number in range(count)
+        ],
+        many=True,
+    ).data
+
+
+def borrow_rows(count):
+    today = date.today()
+    return BorrowHistorySerializer(
+        [
+            {
+                "borrow_id": uuid.uuid4(),
+                "user_id": number % 1000,
+                "book_id": number % 5000,
+                "borrow_date": today - timedelta(days=number % 400),
+                "due_date": today - timedelta(days=number % 400 - 14),
+                "return_date": None if number % 3 else today,
+            }
+            for number in range(count)
+        ],
+        many=True,
+    ).data
+
+
+def cpu_ms(func, repeat):
+    """
+    Best CPU time of `repeat` calls in ms, and the last result
+    """
+    best = None
+    for _ in range(repeat):
+        started = time.process_time()
+        result = func()
+        elapsed = (time.process_time() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = (
+        "Render CPU time and bytes on the wire of large book and borrow lists "
+        "with JSONRenderer and FastJSONRenderer, raw, gzipped and brotli "
+        "compressed. Needs no database rows"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options["rows"], options["repeat"]
+        self.stdout.write(
+            f"orjson {'installed' if orjson else 'missing'}, "
+            f"brotli {'installed' if brotli else 'missing'}, {rows} rows\n"
+        )
+        self.stdout.write(f"{'payload':<10} {'renderer':<18} {'render ms':>10}")
+        for name, data in (("books", book_rows(rows)), ("borrows", borrow_rows(rows))):
+            for renderer in (JSONRenderer(), FastJSONRenderer()):
+                render_ms, content = cpu_ms(lambda: renderer.render(data), repeat)
+                self.stdout.write(
+                    f"{name:<10} {type(renderer).__name__:<18} {render_ms:>10.1f}"
+                )
+            self.report_compression(name, content, repeat)
+            self.stdout.write("")
+
+    def report_compression(self, name, content, repeat):
+        self.stdout.write(f"{'':<10} {'encoding':<18} {'cpu ms':>10} {'bytes':>10}")
+        self.stdout.write(f"{'':<10} {'identity':<18} {0:>10.1f} {len(content):>10}")
+
+        encoders = [("gzip", lambda: gzip.compress(content, compresslevel=6))]
+        if brotli is not None:
+            for quality in (4, 11):
+                encoders.append(
+                    (
+                        f"br q{quality}",
+                        lambda quality=quality: brotli.compress(
+                            content, quality=quality
+                        ),
+                    )
+                )
+
+        for encoding, encode in encoders:
+            encode_ms, compressed = cpu_ms(encode, repeat)
+            self.stdout.write(
+                f"{'':<10} {encoding:<18} {encode_ms:>10.1f} {len(compressed):>10}"
+            )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from library.inventory import reconcile_inventory
+from library.models import copy_inventory_enabled
+
+
+class Command(BaseCommand):
+    help = (
+        "Add or remove BookCopy rows to match total copies and mark as many "
+        "copies taken as there are open borrows. When INVENTORY_MODE is copies "
+        "also refresh Book.available_copies from the free copies"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        derive = copy_inventory_enabled()
+        if not derive:
+            self.stdout.write(
+                "INVENTORY_MODE is counter, available copies are left as they are"
+            )
+
+        books = changed = 0
+        for batch_books, batch_changed in reconcile_inventory(
+            options["batch_size"], derive=derive
+        ):
+            books += batch_books
+            changed += batch_changed
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Reconciled {books} books, {changed} available counts changed"
+            )
+        )
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from library.search import normalize_name, trigrams
+
+
+def index_existing_authors(apps, schema_editor):
+    Author = apps.get_model("library", "Author")
+    AuthorTrigram = apps.get_model("library", "AuthorTrigram")
+
+    for author in Author.objects.all().iterator():
+        author.name_normalized = normalize_name(author.name)
+        author.save(update_fields=["name_normalized"])
+        AuthorTrigram.objects.bulk_create(
+            [
+                AuthorTrigram(author=author, trigram=trigram)
+                for trigram in trigrams(author.name_normalized)
+            ]
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0004_book"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorTrigram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("trigram", models.CharField(max_length=3)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="author",
+            name="name_normalized",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=50
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(
+                fields=["category", "available_copies"],
+                name="book_category_available_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["available_copies"], name="book_available_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["total_copies"], name="book_total_copies_idx"),
+        ),
+        migrations.AddField(
+            model_name="authortrigram",
+            name="author",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="trigrams",
+                to="library.author",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="authortrigram",
+            constraint=models.UniqueConstraint(
+                fields=("trigram", "author"), name="unique_author_trigram"
+            ),
+        ),
+        migrations.RunPython(index_existing_authors, migrations.RunPython.noop),
+    ]
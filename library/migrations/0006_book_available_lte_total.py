@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:19
+
+from django.db import migrations, models
+
+
+def clamp_available_copies(apps, schema_editor):
+    """
+    Books that gained copies through the old racy return path can't take the
+    constraint, their available copies are cut back to the total and reported
+    """
+    Book = apps.get_model("library", "Book")
+    over_total = Book.objects.filter(available_copies__gt=models.F("total_copies"))
+    for title, available, total in over_total.values_list(
+        "title", "available_copies", "total_copies"
+    ):
+        print(f"\n  {title} had {available} available copies of {total}")
+    over_total.update(available_copies=models.F("total_copies"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0005_book_filter_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(clamp_available_copies, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="book",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("available_copies__lte", models.F("total_copies"))),
+                name="book_available_lte_total",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-19 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("library", "0009_catalogversion"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="author",
+            name="name_normalized",
+            field=models.CharField(
+                db_index=True, default="", editable=False, max_length=900
+            ),
+        ),
+    ]
@@ -1,12 +1,27 @@
 import logging
+import random
 
+from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
 
 from .choices import CategoryChoice
+from .search import NORMALIZED_EXPANSION, normalize_name, trigrams
 
 logger = logging.getLogger("__name__")
 
+# INVENTORY_MODE values, see BookCopy
+INVENTORY_COUNTER = "counter"
+INVENTORY_COPIES = "copies"
+
+# Free copies a claim picks from at random, so concurrent borrowers of one
+# title mostly go for different rows
+COPY_CLAIM_CANDIDATES = 8
+
+
+def copy_inventory_enabled():
+    return settings.INVENTORY_MODE == INVENTORY_COPIES
+
 
 class Category(models.Model):
     name = models.CharField(max_length=20, choices=CategoryChoice.choices, unique=True)
@@ -15,13 +30,99 @@ class Category(models.Model):
         return f"Category = {self.name}"
 
 
+class CatalogVersion(models.Model):
+    """
+    Single row stamp set to a new random value whenever a category is saved or
+    deleted
+    - Every process compares it with the version of its CatalogSnapshot and
+      rebuilds the snapshot when it changed, see library.snapshot
+    - Random instead of a counter, so a rolled back change can't hand out a
+      version again that a snapshot was already built at
+    """
+
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"catalog version {self.version}"
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        version = random.getrandbits(63)
+        if not cls.objects.filter(pk=1).update(version=version):
+            cls.objects.update_or_create(pk=1, defaults={"version": version})
+
+
 class Author(models.Model):
     name = models.CharField(max_length=50, unique=True)
+    # NFKD and casefold can lengthen a name, ß becomes ss
+    name_normalized = models.CharField(
+        max_length=50 * NORMALIZED_EXPANSION,
+        db_index=True,
+        editable=False,
+        default="",
+    )
     bio = models.TextField()
 
     def __str__(self):
         return f"Author = {self.name}"
 
+    def save(self, *args, **kwargs):
+        """
+        Keep the normalized name and its trigrams in step with the name
+        """
+        self.name_normalized = normalize_name(self.name)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            if "name" not in update_fields:
+                return super().save(*args, **kwargs)
+            kwargs["update_fields"] = {*update_fields, "name_normalized"}
+
+        super().save(*args, **kwargs)
+        AuthorTrigram.rebuild([self])
+
+
+class AuthorTrigram(models.Model):
+    """
+    One row per distinct trigram of an author's normalized name
+    - Lets substring search on author names use an index instead of a LIKE scan
+    """
+
+    author = models.ForeignKey(Author, on_delete=models.CASCADE, related_name="trigrams")
+    trigram = models.CharField(max_length=3)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["trigram", "author"], name="unique_author_trigram"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.trigram} of author id {self.author_id}"
+
+    @classmethod
+    def rebuild(cls, authors):
+        """
+        Replace the trigram rows of the given authors
+        """
+        try:
+            cls.objects.filter(author__in=authors).delete()
+            cls.objects.bulk_create(
+                [
+                    cls(author=author, trigram=trigram)
+                    for author in authors
+                    for trigram in trigrams(author.name_normalized)
+                ]
+            )
+        except Exception as e:
+            logger.error(f"Error rebuilding author trigrams => {e}", exc_info=True)
+            raise
+
 
 class Book(models.Model):
     title = models.CharField(max_length=100, unique=True)
@@ -33,6 +134,22 @@ class Book(models.Model):
     total_copies = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     available_copies = models.PositiveIntegerField()
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["category", "available_copies"],
+                name="book_category_available_idx",
+            ),
+            models.Index(fields=["available_copies"], name="book_available_idx"),
+            models.Index(fields=["total_copies"], name="book_total_copies_idx"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(available_copies__lte=models.F("total_copies")),
+                name="book_available_lte_total",
+            )
+        ]
+
     def __str__(self):
         return f"{self.title} is written by {self.author.name}"
 
@@ -45,25 +162,159 @@ class Book(models.Model):
     def decrement_copies(self):
         """
         Reduce availabe copies by 1
+        - Guarded UPDATE, so concurrent borrowers on any process or node can
+          never take the count below zero
+        - Returns False if there was no copy left
         """
         try:
-            self.available_copies -= 1
-            self.save(update_fields=["available_copies"])
+            taken = Book.objects.filter(pk=self.pk, available_copies__gt=0).update(
+                available_copies=models.F("available_copies") - 1
+            )
+            if taken:
+                self.available_copies -= 1
+            return bool(taken)
         except Exception as e:
             logger.error(
                 f"Error decrementing copies for {self.title} => {e}", exc_info=True
             )
             raise
 
+    def sync_copies(self):
+        """
+        Add or remove BookCopy rows until there are total_copies of them
+        - Only free copies are removed, borrowed ones go once they are returned
+        """
+        try:
+            copies = self.copies.count()
+            if copies < self.total_copies:
+                BookCopy.objects.bulk_create(
+                    [BookCopy(book=self) for _ in range(self.total_copies - copies)]
+                )
+            elif copies > self.total_copies:
+                surplus = self.copies.filter(is_available=True).values_list(
+                    "pk", flat=True
+                )[: copies - self.total_copies]
+                BookCopy.objects.filter(pk__in=list(surplus)).delete()
+        except Exception as e:
+            logger.error(f"Error syncing copies for {self.title} => {e}", exc_info=True)
+            raise
+
     def increment_copies(self):
         """
         Increment availabe copies by 1
+        - Guarded UPDATE that never goes above total copies
+        - Returns False if every copy was already available
         """
         try:
-            self.available_copies += 1
-            self.save(update_fields=["available_copies"])
+            returned = Book.objects.filter(
+                pk=self.pk, available_copies__lt=models.F("total_copies")
+            ).update(available_copies=models.F("available_copies") + 1)
+            if returned:
+                self.available_copies += 1
+            return bool(returned)
         except Exception as e:
             logger.error(
                 f"Error incrementing copies for {self.title} => {e}", exc_info=True
             )
             raise
+
+
+class BookCopyQuerySet(models.QuerySet):
+    def claim(self, book_id):
+        """
+        Mark one free copy of the book as borrowed
+        - Each attempt is a conditional UPDATE of a single copy row picked at
+          random from a few free ones, so borrowers of the same title claim
+          different rows in parallel instead of queueing on Book
+        Returns the claimed copy id, or None if no copy is free
+        """
+        while True:
+            candidates = list(
+                self.filter(book_id=book_id, is_available=True).values_list(
+                    "pk", flat=True
+                )[:COPY_CLAIM_CANDIDATES]
+            )
+            if not candidates:
+                return None
+
+            random.shuffle(candidates)
+            for pk in candidates:
+                if self.filter(pk=pk, is_available=True).update(is_available=False):
+                    return pk
+
+    def release(self, copy_id):
+        """
+        Mark a borrowed copy as free again, returns False if it already was
+        """
+        return bool(
+            self.filter(pk=copy_id, is_available=False).update(is_available=True)
+        )
+
+    def release_any(self, book_id):
+        """
+        Free one borrowed copy of the book that no open borrow holds, for
+        borrows made before copy inventory was switched on
+        """
+        Borrow = self.model._meta.get_field("borrows").related_model
+        held = Borrow.objects.filter(
+            copy=models.OuterRef("pk"), return_date__isnull=True
+        )
+        candidates = (
+            self.filter(book_id=book_id, is_available=False)
+            .exclude(models.Exists(held))
+            .values_list("pk", flat=True)[:COPY_CLAIM_CANDIDATES]
+        )
+        return any(self.release(pk) for pk in candidates)
+
+
+class BookCopy(models.Model):
+    """
+    One physical copy of a book, used when INVENTORY_MODE is "copies"
+    - Borrowing claims a free copy row instead of decrementing
+      Book.available_copies, which then is a derived value refreshed by the
+      reconcile_inventory command
+    """
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="copies")
+    is_available = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = BookCopyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["book"],
+                condition=models.Q(is_available=True),
+                name="bookcopy_available_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"copy {self.pk} of book id {self.book_id}"
+
+
+class BookNeighbor(models.Model):
+    """
+    One of the books most often borrowed by readers of `book`, written by the
+    build_recommendations command
+    - rank 0 is the strongest neighbor, score is the number of readers who
+      borrowed both books
+    """
+
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name="neighbors")
+    neighbor = models.ForeignKey(
+        Book, on_delete=models.CASCADE, related_name="neighbor_of"
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["book", "rank"], name="unique_book_neighbor_rank"
+            )
+        ]
+
+    def __str__(self):
+        return f"book id {self.neighbor_id} is neighbor {self.rank} of book id {self.book_id}"
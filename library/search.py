@@ -0,0 +1,55 @@
+import unicodedata
+
+from .choices import CategoryChoice
+
+TRIGRAM_SIZE = 3
+
+# Most characters normalize_name can produce from one character (U+FDFA)
+NORMALIZED_EXPANSION = 18
+
+
+def normalize_name(value):
+    """
+    Lower case, accent free, single spaced form of a name used for lookups
+    """
+    decomposed = unicodedata.normalize("NFKD", value or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.casefold().split())
+
+
+def trigrams(value):
+    """
+    Every 3 character slice of an already normalized value
+    """
+    return {
+        value[index : index + TRIGRAM_SIZE]
+        for index in range(len(value) - TRIGRAM_SIZE + 1)
+    }
+
+
+def split_terms(value):
+    """
+    Normalized terms of a comma separated filter value
+    """
+    return [
+        term for term in (normalize_name(part) for part in value.split(",")) if term
+    ]
+
+
+# Every spelling of a category a client may send, mapped to its CategoryChoice value
+CATEGORY_LOOKUP = {}
+for choice in CategoryChoice:
+    for spelling in (choice.value, choice.label, choice.value.replace("_", " ")):
+        CATEGORY_LOOKUP[normalize_name(spelling)] = choice.value
+
+
+def resolve_categories(term):
+    """
+    CategoryChoice values matching a normalized term
+    - An exact value or label wins
+    - Otherwise every category whose value or label contains the term,
+      the same result the old icontains lookup gave
+    """
+    if term in CATEGORY_LOOKUP:
+        return {CATEGORY_LOOKUP[term]}
+    return {value for spelling, value in CATEGORY_LOOKUP.items() if term in spelling}
@@ -1,8 +1,9 @@
 import logging
 
+from django.db.models import F
 from rest_framework import serializers
 
-from .models import Author, Book, Category
+from .models import Author, Book, Category, copy_inventory_enabled
 
 logger = logging.getLogger("__name__")
 
@@ -85,10 +86,14 @@ class BookSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         """
         Set available copies equal to total copies when creating a book
+        - With copy inventory the copy rows are created as well
         """
         try:
             validated_data["available_copies"] = validated_data["total_copies"]
-            return super().create(validated_data)
+            book = super().create(validated_data)
+            if copy_inventory_enabled():
+                book.sync_copies()
+            return book
         except Exception as e:
             logger.error("Error occure in creating book> {e}", exc_info=True)
             raise serializers.ValidationError("An error occure while creating a book")
@@ -96,12 +101,14 @@ class BookSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         """
         Update a book instance while adjusting available copies if total copies changed
+        - Available copies are shifted with an F() expression so borrows running
+          at the same time are not overwritten
         """
         try:
             if "total_copies" in validated_data:
                 extra_copies = validated_data["total_copies"] - instance.total_copies
                 validated_data["available_copies"] = (
-                    instance.available_copies + extra_copies
+                    F("available_copies") + extra_copies
                 )
 
             update_fields = []
@@ -111,6 +118,11 @@ class BookSerializer(serializers.ModelSerializer):
                 update_fields.append(attr)
 
             instance.save(update_fields=update_fields)
+
+            if "available_copies" in update_fields:
+                instance.refresh_from_db(fields=["available_copies"])
+                if copy_inventory_enabled():
+                    instance.sync_copies()
             return instance
         except Exception as e:
             logger.error("Error occure in updating book> {e}", exc_info=True)
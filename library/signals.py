@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import CatalogVersion, Category
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_catalog_version(sender, **kwargs):
+    """
+    Make every process rebuild its catalog snapshot, also for bulk deletes
+    from the admin, which skip Model.delete()
+    """
+    CatalogVersion.bump()
@@ -0,0 +1,73 @@
+import logging
+from array import array
+from bisect import bisect_left
+
+from .models import CatalogVersion, Category
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """
+    Immutable, compact copy of the categories at one catalog version
+    - Ids live in a sorted typed array next to a tuple of names, so the
+      snapshot is a handful of objects instead of one per row, and pages
+      loaded before fork stay shared between workers
+    """
+
+    __slots__ = ("version", "_category_ids", "_category_names")
+
+    def __init__(self, version, categories):
+        categories = sorted(categories)
+
+        self.version = version
+        self._category_ids = array("q", [pk for pk, _ in categories])
+        self._category_names = tuple(name for _, name in categories)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError("CatalogSnapshot is immutable")
+        super().__setattr__(name, value)
+
+    def __len__(self):
+        return len(self._category_ids)
+
+    def category_map(self):
+        """
+        Category name to id
+        """
+        return dict(zip(self._category_names, self._category_ids))
+
+    def category_name(self, category_id):
+        index = bisect_left(self._category_ids, category_id)
+        if index == len(self._category_ids) or self._category_ids[index] != category_id:
+            return None
+        return self._category_names[index]
+
+
+_snapshot = None
+
+
+def load_catalog_snapshot():
+    """
+    Build the snapshot from the database and keep it for this process
+    - The version is read before the rows, so a change made in between only
+      makes the next call build the snapshot again
+    """
+    global _snapshot
+
+    version = CatalogVersion.current()
+    _snapshot = CatalogSnapshot(version, Category.objects.values_list("id", "name"))
+    return _snapshot
+
+
+def get_catalog_snapshot():
+    """
+    The snapshot of this process, rebuilt when a category was saved or deleted
+    in any process since it was loaded
+    - One primary key lookup of the catalog version per call
+    """
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != CatalogVersion.current():
+        snapshot = load_catalog_snapshot()
+    return snapshot
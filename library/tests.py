@@ -1,3 +1,188 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from user.models import CustomUser
+
+from .choices import CategoryChoice
+from .filters import BookFilter
+from .inventory import reconcile_batch
+from .models import Author, Book, BookCopy, BookNeighbor, CatalogVersion, Category
+from .snapshot import get_catalog_snapshot
+
+
+def create_book(title, category, copies=1):
+    author, _ = Author.objects.get_or_create(name="Author", bio="")
+    return Book.objects.create(
+        title=title,
+        description="",
+        author=author,
+        category=category,
+        total_copies=copies,
+        available_copies=copies,
+    )
+
+
+class CategoryFilterTests(TestCase):
+    def filter_titles(self, value):
+        queryset = BookFilter({"category": value}, queryset=Book.objects.all()).qs
+        return set(queryset.values_list("title", flat=True))
+
+    def test_filter_by_category(self):
+        fiction = Category.objects.create(name=CategoryChoice.FICTION)
+        history = Category.objects.create(name=CategoryChoice.HISTORY)
+        create_book("Novel", fiction)
+        create_book("Chronicle", history)
+
+        self.assertEqual(self.filter_titles("fiction"), {"Novel"})
+        self.assertEqual(self.filter_titles("fiction,history"), {"Novel", "Chronicle"})
+
+    def test_recreated_category(self):
+        category = Category.objects.create(name=CategoryChoice.FICTION)
+        self.assertEqual(self.filter_titles("fiction"), set())
+
+        category.delete()
+        category = Category.objects.create(name=CategoryChoice.FICTION)
+        create_book("Novel", category)
+
+        self.assertEqual(self.filter_titles("fiction"), {"Novel"})
+
+    def test_bulk_delete_and_rename(self):
+        Category.objects.create(name=CategoryChoice.FICTION)
+        self.assertEqual(self.filter_titles("fiction"), set())
+
+        Category.objects.filter(name=CategoryChoice.FICTION).delete()
+        category = Category.objects.create(name=CategoryChoice.HISTORY)
+        create_book("Chronicle", category)
+        self.assertEqual(self.filter_titles("history"), {"Chronicle"})
+
+
+class AuthorFilterTests(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name=CategoryChoice.FICTION)
+        for title, name in (
+            ("Hamlet", "William Shakespeare"),
+            ("Faust", "Goethe Straße"),
+        ):
+            author = Author.objects.create(name=name, bio="")
+            Book.objects.create(
+                title=title,
+                description="",
+                author=author,
+                category=category,
+                total_copies=1,
+                available_copies=1,
+            )
+
+    def filter_titles(self, value):
+        queryset = BookFilter({"author": value}, queryset=Book.objects.all()).qs
+        return set(queryset.values_list("title", flat=True))
+
+    def test_short_term_matches_anywhere(self):
+        self.assertEqual(self.filter_titles("sh"), {"Hamlet"})
+        self.assertEqual(self.filter_titles("ss"), {"Faust"})
+
+    def test_long_term_matches_anywhere(self):
+        self.assertEqual(self.filter_titles("speare"), {"Hamlet"})
+        self.assertEqual(self.filter_titles("STRASSE"), {"Faust"})
+
+
+class CatalogSnapshotTests(TestCase):
+    def test_kept_while_the_version_holds(self):
+        fiction = Category.objects.create(name=CategoryChoice.FICTION)
+        snapshot = get_catalog_snapshot()
+
+        self.assertIs(get_catalog_snapshot(), snapshot)
+        self.assertEqual(snapshot.category_name(fiction.pk), CategoryChoice.FICTION)
+        self.assertIsNone(snapshot.category_name(fiction.pk + 1))
+        with self.assertRaises(AttributeError):
+            snapshot.version = 0
+
+    def test_rebuilt_after_a_change_in_another_process(self):
+        fiction = Category.objects.create(name=CategoryChoice.FICTION)
+        snapshot = get_catalog_snapshot()
+
+        # A rename committed by another worker, which bumps the version there
+        Category.objects.filter(pk=fiction.pk).update(name=CategoryChoice.HISTORY)
+        CatalogVersion.objects.filter(pk=1).update(version=snapshot.version + 1)
+
+        rebuilt = get_catalog_snapshot()
+        self.assertIsNot(rebuilt, snapshot)
+        self.assertEqual(rebuilt.category_map(), {CategoryChoice.HISTORY: fiction.pk})
+
+
+class RelatedBooksTests(APITestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(username="reader", password="x")
+        self.client.force_authenticate(user)
+        category = Category.objects.create(name=CategoryChoice.FICTION)
+        self.book = create_book("Novel", category)
+        self.second = create_book("Second", category)
+        self.third = create_book("Third", category)
+
+    def test_neighbors_strongest_first(self):
+        BookNeighbor.objects.create(
+            book=self.book, neighbor=self.third, rank=1, score=2
+        )
+        BookNeighbor.objects.create(
+            book=self.book, neighbor=self.second, rank=0, score=5
+        )
+
+        response = self.client.get(f"/api/books/{self.book.pk}/related/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([book["title"] for book in response.data], ["Second", "Third"])
+
+    def test_book_without_neighbors(self):
+        response = self.client.get(f"/api/books/{self.book.pk}/related/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, [])
+
+    def test_missing_book(self):
+        response = self.client.get(f"/api/books/{self.third.pk + 100}/related/")
+
+        self.assertEqual(response.status_code, 404)
+
+
+class BookAdminActionTests(TestCase):
+    def setUp(self):
+        admin = CustomUser.objects.create_superuser(username="admin", password="x")
+        self.client.force_login(admin)
+        category = Category.objects.create(name=CategoryChoice.FICTION)
+        self.book = create_book("Novel", category, copies=2)
+        reconcile_batch([self.book], derive=False)
+
+    def run_action(self, action):
+        return self.client.post(
+            "/admin/library/book/",
+            {"action": action, "_selected_action": [self.book.pk]},
+        )
+
+    def copies(self):
+        return BookCopy.objects.filter(book=self.book)
+
+    def test_add_one_copy(self):
+        self.run_action("add_one_copy")
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.total_copies, 3)
+        self.assertEqual(self.book.available_copies, 3)
+        self.assertEqual(self.copies().filter(is_available=True).count(), 3)
+
+    def test_remove_one_available_copy(self):
+        self.run_action("remove_one_available_copy")
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.total_copies, 1)
+        self.assertEqual(self.book.available_copies, 1)
+        self.assertEqual(self.copies().count(), 1)
+
+    @override_settings(INVENTORY_MODE="copies")
+    def test_remove_needs_a_free_copy(self):
+        self.copies().update(is_available=False)
+
+        self.run_action("remove_one_available_copy")
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.total_copies, 2)
+        self.assertEqual(self.copies().count(), 2)
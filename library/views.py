@@ -1,6 +1,10 @@
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from library_management.breaker import serve_with_stale_fallback
 
 from .filters import BookFilter
 from .models import Author, Book, Category
@@ -32,8 +36,9 @@ class AuthorViewset(viewsets.ModelViewSet):
 class BookViewset(viewsets.ModelViewSet):
     """
     API endpoints for for managing books
-    - Authenticated user can list and retrieve books
+    - Authenticated user can list and retrieve books and see related books
     - Only admin can create, update and delete books
+    - List and retrieve fall back to a stale copy when the database is saturated
     """
 
     queryset = Book.objects.select_related("author", "category")
@@ -42,9 +47,42 @@ class BookViewset(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
 
     def get_permissions(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "related"]:
             self.permission_classes = [IsAuthenticated]
         else:
             self.permission_classes = [IsAdminUser]
 
         return super().get_permissions()
+
+    def list(self, request, *args, **kwargs):
+        return serve_with_stale_fallback(
+            request,
+            "book_list",
+            lambda: super(BookViewset, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return serve_with_stale_fallback(
+            request,
+            "book_detail",
+            lambda: super(BookViewset, self).retrieve(request, *args, **kwargs),
+        )
+
+    @action(detail=True, methods=["get"])
+    def related(self, request, pk=None):
+        """
+        Books most often borrowed by readers of this book, strongest first
+        - 404 for a missing book, an existing book without neighbors gets []
+        - One indexed query on the precomputed BookNeighbor rows
+        """
+        if not str(pk).isdigit() or not Book.objects.filter(pk=pk).exists():
+            return Response(
+                {"details": "Book not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        books = (
+            Book.objects.filter(neighbor_of__book_id=pk)
+            .select_related("author", "category")
+            .order_by("neighbor_of__rank")
+        )
+        return Response(self.get_serializer(books, many=True).data)
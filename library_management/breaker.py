@@ -0,0 +1,172 @@
+"""
+Database circuit breaker
+
+Every query run while serving a request is timed. When too many of the last
+DB_BREAKER_WINDOW ones failed with an OperationalError (locked or unreachable database)
+or took longer than DB_BREAKER_SLOW_QUERY seconds, the breaker opens: write
+requests are refused at once with 503 and Retry-After instead of queueing on
+the database, and book list/retrieve are answered from a stale copy. After
+DB_BREAKER_OPEN_SECONDS requests are let through again (half open) and the
+breaker closes or opens again on the outcome of the next DB_BREAKER_MIN_CALLS
+queries.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import OperationalError
+from rest_framework.response import Response
+
+from .metrics import BREAKER_OPENED, SHED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+STALE_CACHE_PREFIX = "stale-response:"
+
+
+class CircuitBreaker:
+    """
+    Closed, open or half open state of the database, shared by the threads
+    of one process
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.calls = deque()
+
+    def _open(self, now):
+        if self.state != OPEN:
+            logger.warning("Database circuit breaker opened")
+            BREAKER_OPENED.inc()
+        self.state = OPEN
+        self.opened_at = now
+        self.calls.clear()
+
+    def record(self, duration, failed):
+        """
+        Add the outcome of one query, slow queries count as failures
+        """
+        failed = failed or duration >= settings.DB_BREAKER_SLOW_QUERY
+        now = time.monotonic()
+
+        with self.lock:
+            if self.state == OPEN:
+                return
+
+            self.calls.append(failed)
+            while len(self.calls) > settings.DB_BREAKER_WINDOW:
+                self.calls.popleft()
+            if len(self.calls) < settings.DB_BREAKER_MIN_CALLS:
+                return
+
+            failures = sum(self.calls)
+            if failures / len(self.calls) >= settings.DB_BREAKER_FAILURE_RATE:
+                self._open(now)
+            elif self.state == HALF_OPEN:
+                logger.warning("Database circuit breaker closed")
+                self.state = CLOSED
+
+    def allow_request(self):
+        """
+        False while the breaker is open, moves to half open once the open
+        period is over
+        """
+        with self.lock:
+            if self.state != OPEN:
+                return True
+            if time.monotonic() - self.opened_at < settings.DB_BREAKER_OPEN_SECONDS:
+                return False
+            self.state = HALF_OPEN
+            self.calls.clear()
+            return True
+
+    def retry_after(self):
+        """
+        Whole seconds until the breaker lets requests through again
+        """
+        remaining = settings.DB_BREAKER_OPEN_SECONDS - (
+            time.monotonic() - self.opened_at
+        )
+        return max(math.ceil(remaining), 1)
+
+    def reset(self):
+        with self.lock:
+            self.state = CLOSED
+            self.calls.clear()
+
+
+db_breaker = CircuitBreaker()
+
+
+class QueryObserver:
+    """
+    execute_wrapper that reports every query of one request to the breaker
+    and remembers whether the database failed during the request
+    """
+
+    def __init__(self, breaker=db_breaker):
+        self.breaker = breaker
+        self.database_failed = False
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            result = execute(sql, params, many, context)
+        except OperationalError:
+            self.database_failed = True
+            self.breaker.record(time.perf_counter() - started, failed=True)
+            raise
+        self.breaker.record(time.perf_counter() - started, failed=False)
+        return result
+
+
+def stale_cache_key(request):
+    return STALE_CACHE_PREFIX + request.get_full_path()
+
+
+def serve_with_stale_fallback(request, endpoint, render):
+    """
+    Render a read only response, or answer from the last good copy when the
+    breaker is open or the database fails
+    - The copy is refreshed at most every STALE_CACHE_REFRESH seconds and kept
+      for STALE_CACHE_TTL seconds
+    - Answers from the copy carry a Stale-Response: true header
+    """
+    key = stale_cache_key(request)
+
+    def stale_response():
+        data = cache.get(key)
+        if data is None:
+            return None
+        SHED_REQUESTS.inc(endpoint=endpoint, outcome="stale")
+        return Response(data, headers={"Stale-Response": "true"})
+
+    if not db_breaker.allow_request():
+        response = stale_response()
+        if response is not None:
+            return response
+
+    try:
+        response = render()
+    except OperationalError:
+        response = stale_response()
+        if response is None:
+            raise
+        return response
+
+    if response.status_code == 200 and cache.add(
+        f"{key}:fresh", True, settings.STALE_CACHE_REFRESH
+    ):
+        cache.set(key, response.data, settings.STALE_CACHE_TTL)
+    return response
@@ -0,0 +1,173 @@
+"""
+Worker cold start report
+
+Boots the WSGI application in fresh interpreters under ``python -X importtime``
+and reports boot time, peak memory and the slowest imports for each settings
+module. The parent process never imports Django, so it measures nothing but
+the children.
+
+    python -m library_management.importtime
+    python -m library_management.importtime --settings library_management.settings_production
+    python -m library_management.importtime --json --budget-ms 800
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+IMPORTTIME_LINE = re.compile(
+    r"^import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|(?P<name>.*)$"
+)
+
+# Boots the worker like a WSGI server would and prints its own numbers
+BOOT_SCRIPT = """
+import json, resource, time
+started = time.perf_counter()
+from library_management.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({
+    "boot_ms": (time.perf_counter() - started) * 1000,
+    "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+
+def parse_importtime(stderr):
+    """
+    (self_us, cumulative_us, depth, module) for every line of -X importtime output
+    """
+    imports = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        raw_name = match["name"]
+        name = raw_name.strip()
+        depth = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        imports.append((int(match["self"]), int(match["cumulative"]), depth, name))
+    return imports
+
+
+def boot_once(settings_module):
+    env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings_module}
+    # The production profile refuses to boot without a secret key, a metrics
+    # token and a cache, the child only boots and never serves a request
+    env.setdefault("DJANGO_SECRET_KEY", "importtime")
+    env.setdefault("METRICS_TOKEN", "importtime")
+    env.setdefault("REDIS_URL", "redis://localhost:6379/0")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT],
+        cwd=BASE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"Booting {settings_module} failed:\n{result.stderr[-2000:]}"
+        )
+
+    numbers = json.loads(result.stdout.strip().splitlines()[-1])
+    return numbers, parse_importtime(result.stderr)
+
+
+def report(settings_module, repeat, top):
+    runs = [boot_once(settings_module) for _ in range(repeat)]
+    median_run = sorted(runs, key=lambda run: run[0]["boot_ms"])[len(runs) // 2]
+    imports = median_run[1]
+
+    by_package = defaultdict(int)
+    for self_us, _, _, name in imports:
+        by_package[name.split(".")[0]] += self_us
+
+    return {
+        "settings": settings_module,
+        "runs": repeat,
+        "boot_ms": statistics.median(run[0]["boot_ms"] for run in runs),
+        "max_rss_kb": statistics.median(run[0]["max_rss_kb"] for run in runs),
+        "modules_imported": len(imports),
+        "import_ms": sum(self_us for self_us, _, _, _ in imports) / 1000,
+        "slowest_packages": [
+            {"package": package, "self_ms": self_us / 1000}
+            for package, self_us in sorted(
+                by_package.items(), key=lambda item: item[1], reverse=True
+            )[:top]
+        ],
+        "slowest_top_level_imports": [
+            {"module": name, "cumulative_ms": cumulative_us / 1000}
+            for _, cumulative_us, depth, name in sorted(
+                (item for item in imports if item[2] == 0),
+                key=lambda item: item[1],
+                reverse=True,
+            )[:top]
+        ],
+    }
+
+
+def print_report(result):
+    print(f"== {result['settings']} (median of {result['runs']} boots)")
+    print(f"boot time        {result['boot_ms']:10.1f} ms")
+    print(f"import time      {result['import_ms']:10.1f} ms")
+    print(f"modules imported {result['modules_imported']:10d}")
+    print(f"peak RSS         {result['max_rss_kb'] / 1024:10.1f} MB")
+    print("slowest packages (self time):")
+    for item in result["slowest_packages"]:
+        print(f"  {item['package']:<40} {item['self_ms']:8.1f} ms")
+    print("slowest top level imports (cumulative):")
+    for item in result["slowest_top_level_imports"]:
+        print(f"  {item['module']:<40} {item['cumulative_ms']:8.1f} ms")
+    print()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--settings",
+        action="append",
+        help="Settings module to boot, can be given more than once",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", action="store_true", help="Print JSON for CI")
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        help="Exit with status 1 if any median boot time is above this",
+    )
+    args = parser.parse_args(argv)
+
+    settings_modules = args.settings or [
+        "library_management.settings",
+        "library_management.settings_production",
+    ]
+    results = [report(module, args.repeat, args.top) for module in settings_modules]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for result in results:
+            print_report(result)
+
+    if args.budget_ms is not None:
+        over_budget = [r for r in results if r["boot_ms"] > args.budget_ms]
+        for result in over_budget:
+            print(
+                f"{result['settings']} boots in {result['boot_ms']:.1f} ms, "
+                f"over the {args.budget_ms:.1f} ms budget",
+                file=sys.stderr,
+            )
+        return 1 if over_budget else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+In-process counters and histograms exposed in Prometheus text format
+
+Every metric keeps its own lock, so observing from request threads is safe.
+When METRICS_MULTIPROCESS_DIR is set, every worker process dumps its values
+to <dir>/<pid>-<id>.json at most every METRICS_FLUSH_INTERVAL seconds and
+/metrics sums the files of all workers. The id is drawn once per process, so
+a worker that gets the pid of a dead one starts a file of its own. A scrape
+folds the files of processes that are no longer running into
+<dir>/archive.json and removes them, so totals never go backwards.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+ARCHIVE_FILENAME = "archive.json"
+LOCK_FILENAME = "archive.lock"
+
+
+def _format_labels(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _filename_pid(filename):
+    """
+    Pid of a worker file named <pid>-<id>.json, None for any other file
+    """
+    if not filename.endswith(".json"):
+        return None
+    pid = filename[: -len(".json")].split("-")[0]
+    return int(pid) if pid.isdigit() else None
+
+
+def _read_json(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error reading metrics file {path}=> {e}")
+        return None
+
+
+def _write_json(directory, filename, data):
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w") as tmp:
+        json.dump(data, tmp)
+    os.replace(tmp_path, os.path.join(directory, filename))
+
+
+@contextmanager
+def _directory_lock(directory):
+    """
+    Serialize scrapes that archive files of dead workers
+    """
+    import fcntl
+
+    with open(os.path.join(directory, LOCK_FILENAME), "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} needs labels {self.labelnames}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                json.dumps(key): self._copy(value)
+                for key, value in self._values.items()
+            }
+
+    def _copy(self, value):
+        return value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    @staticmethod
+    def merge(samples, other):
+        for key, value in other.items():
+            samples[key] = samples.get(key, 0) + value
+
+    def render(self, samples):
+        lines = []
+        for key, value in sorted(samples.items()):
+            labels = _format_labels(self.labelnames, json.loads(key))
+            lines.append(f"{self.name}_total{labels} {_format_value(value)}")
+        return lines
+
+
+class Histogram(Metric):
+    """
+    Fixed bucket histogram, a sample is [count per bucket..., sum, count]
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                sample = self._values[key] = [0] * (len(self.buckets) + 3)
+            sample[index] += 1
+            sample[-2] += value
+            sample[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _copy(self, value):
+        return list(value)
+
+    @staticmethod
+    def merge(samples, other):
+        for key, value in other.items():
+            current = samples.get(key)
+            if current is None:
+                samples[key] = list(value)
+            else:
+                samples[key] = [a + b for a, b in zip(current, value)]
+
+    def render(self, samples):
+        lines = []
+        for key, sample in sorted(samples.items()):
+            label_values = json.loads(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), sample):
+                cumulative += count
+                labels = _format_labels(
+                    self.labelnames + ("le",), label_values + [_format_value(bound)]
+                )
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sample[-2])}")
+            lines.append(f"{self.name}_count{labels} {sample[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._last_flush = 0.0
+        self._pid = None
+        self._filename = None
+
+    def register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self):
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def _multiprocess_dir(self):
+        return getattr(settings, "METRICS_MULTIPROCESS_DIR", None)
+
+    def _process_filename(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            self._pid = pid
+            self._filename = f"{pid}-{uuid.uuid4().hex[:12]}.json"
+        return self._filename
+
+    def flush(self):
+        """
+        Write this process' values to the multiprocess directory
+        """
+        directory = self._multiprocess_dir()
+        if not directory:
+            return
+
+        self._last_flush = time.monotonic()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            _write_json(directory, self._process_filename(), self.snapshot())
+        except Exception as e:
+            logger.error(f"Error flushing metrics=> {e}", exc_info=True)
+
+    def maybe_flush(self):
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 5)
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def archive_dead_processes(self, directory):
+        """
+        Add the files of workers that are no longer running to the archive
+        and remove them
+        - Call with the directory lock held
+        """
+        dead = []
+        for filename in os.listdir(directory):
+            pid = _filename_pid(filename)
+            if pid is not None and not _process_alive(pid):
+                dead.append(filename)
+        if not dead:
+            return
+
+        archive = {}
+        archive_path = os.path.join(directory, ARCHIVE_FILENAME)
+        if os.path.exists(archive_path):
+            archive = _read_json(archive_path)
+            if archive is None:
+                return
+
+        for filename in dead:
+            snapshot = _read_json(os.path.join(directory, filename))
+            for name, samples in (snapshot or {}).items():
+                metric = self._metrics.get(name)
+                if metric is not None:
+                    metric.merge(archive.setdefault(name, {}), samples)
+
+        _write_json(directory, ARCHIVE_FILENAME, archive)
+        for filename in dead:
+            os.remove(os.path.join(directory, filename))
+
+    def collect(self):
+        """
+        Values of this process, summed with every other worker's file and
+        the archive of dead workers if multiprocess mode is on
+        """
+        directory = self._multiprocess_dir()
+        if not directory:
+            return self.snapshot()
+
+        self.flush()
+        merged = {name: {} for name in self._metrics}
+        with _directory_lock(directory):
+            try:
+                self.archive_dead_processes(directory)
+            except Exception as e:
+                logger.error(f"Error archiving metrics files=> {e}", exc_info=True)
+
+            for filename in os.listdir(directory):
+                if not filename.endswith(".json"):
+                    continue
+                snapshot = _read_json(os.path.join(directory, filename))
+                if snapshot is None:
+                    continue
+
+                for name, samples in snapshot.items():
+                    metric = self._metrics.get(name)
+                    if metric is not None:
+                        metric.merge(merged[name], samples)
+        return merged
+
+    def render(self):
+        collected = self.collect()
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render(collected.get(name, {})))
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUESTS = registry.counter(
+    "library_requests",
+    "Requests to the application hot paths",
+    ["endpoint", "status"],
+)
+REQUEST_DURATION = registry.histogram(
+    "library_request_duration_seconds",
+    "Time spent serving hot path requests",
+    ["endpoint"],
+)
+LOCK_WAIT = registry.histogram(
+    "library_lock_wait_seconds",
+    "Wait for the database write lock or row lock in borrow and return",
+    ["operation"],
+)
+BORROW_REJECTIONS = registry.counter(
+    "library_borrow_rejections",
+    "Borrow requests rejected by business rules",
+    ["reason"],
+)
+BREAKER_OPENED = registry.counter(
+    "library_db_breaker_opened",
+    "Times the database circuit breaker opened",
+)
+SHED_REQUESTS = registry.counter(
+    "library_shed_requests",
+    "Requests refused or answered from a stale copy while the database was saturated",
+    ["endpoint", "outcome"],
+)
@@ -0,0 +1,240 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.db import connection
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence, compress_string
+
+from .breaker import QueryObserver, db_breaker
+from .metrics import REQUEST_DURATION, REQUESTS, SHED_REQUESTS, registry
+
+try:
+    import brotli
+except ImportError:  # optional, responses are gzipped without it
+    brotli = None
+
+SEARCH_PARAMS = {"author", "category", "available", "min_copies", "max_copies"}
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def hot_path_name(request):
+    """
+    Name of the hot path a request belongs to, or None for everything else
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return None
+
+    url_name = match.url_name
+    if request.method == "POST":
+        return {
+            "borrow": "borrow",
+            "return-book": "return",
+            "token_obtain_pair": "login",
+        }.get(url_name)
+    if request.method == "GET" and url_name == "book-list":
+        if SEARCH_PARAMS.intersection(request.GET):
+            return "book_search"
+        return "book_list"
+    return None
+
+
+class MetricsMiddleware:
+    """
+    Count and time borrow, return, login, book list and book search requests
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+
+        endpoint = hot_path_name(request)
+        if endpoint is not None:
+            REQUEST_DURATION.observe(time.perf_counter() - started, endpoint=endpoint)
+            REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            registry.maybe_flush()
+
+        return response
+
+
+def database_unavailable(retry_after):
+    response = JsonResponse(
+        {"details": "Service is busy, please try again later"}, status=503
+    )
+    response["Retry-After"] = str(retry_after)
+    return response
+
+
+class LoadSheddingMiddleware:
+    """
+    Feed the database circuit breaker and shed load while it is open
+    - Every query of the request is timed and reported to the breaker
+    - Write requests are refused with 503 and Retry-After while the breaker is
+      open, before they touch the database
+    - A 500 caused by a locked or unreachable database becomes a 503 too
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        observer = QueryObserver()
+        with connection.execute_wrapper(observer):
+            response = self.get_response(request)
+
+        if response.status_code == 500 and observer.database_failed:
+            return database_unavailable(db_breaker.retry_after())
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS or db_breaker.allow_request():
+            return None
+
+        SHED_REQUESTS.inc(endpoint=request.resolver_match.url_name, outcome="rejected")
+        return database_unavailable(db_breaker.retry_after())
+
+
+def is_bearer_api_request(request):
+    return request.path_info.startswith("/api/") and request.headers.get(
+        "Authorization", ""
+    ).startswith("Bearer ")
+
+
+class SkipForBearerAPIMixin:
+    """
+    Pass API requests that carry a bearer token straight through
+    - They are authenticated by JWT, so session, user and message
+      handling would only add work
+    """
+
+    def __call__(self, request):
+        if is_bearer_api_request(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class APISessionMiddleware(SkipForBearerAPIMixin, SessionMiddleware):
+    pass
+
+
+class APIAuthenticationMiddleware(SkipForBearerAPIMixin, AuthenticationMiddleware):
+    pass
+
+
+class APIMessageMiddleware(SkipForBearerAPIMixin, MessageMiddleware):
+    pass
+
+
+def accepted_encodings(header):
+    """
+    Content codings of an Accept-Encoding header that are not refused with q=0
+    """
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def choose_encoding(header):
+    """
+    br when the client takes it and brotli is installed, then gzip, else None
+    """
+    accepted = accepted_encodings(header)
+    if brotli is not None and accepted & {"br", "*"}:
+        return "br"
+    if accepted & {"gzip", "*"}:
+        return "gzip"
+    return None
+
+
+def compress_brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+    for chunk in sequence:
+        yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress text and JSON responses with brotli or gzip, whichever the client
+    accepts (brotli first, and only if the brotli package is installed)
+    - Responses under COMPRESSION_MIN_SIZE bytes are sent as they are, the
+      CPU isn't worth it
+    - Streaming responses are compressed chunk by chunk as they are sent
+    - gzip output gets the same random padding as Django's GZipMiddleware
+      against BREACH
+    """
+
+    max_random_bytes = GZipMiddleware.max_random_bytes
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.has_header("Content-Encoding") or getattr(
+            response, "is_async", False
+        ):
+            return response
+        if not response.get("Content-Type", "").startswith(COMPRESSIBLE_TYPES):
+            return response
+        if not response.streaming and (
+            len(response.content) < settings.COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if encoding == "br":
+                content = compress_brotli_sequence(response.streaming_content)
+            else:
+                content = compress_sequence(
+                    response.streaming_content, max_random_bytes=self.max_random_bytes
+                )
+            response.streaming_content = content
+            del response.headers["Content-Length"]
+        else:
+            if encoding == "br":
+                compressed = brotli.compress(
+                    response.content, quality=settings.COMPRESSION_BROTLI_QUALITY
+                )
+            else:
+                compressed = compress_string(
+                    response.content, max_random_bytes=self.max_random_bytes
+                )
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,68 @@
+import logging
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows an exact COUNT(*) is cheap enough
+EXACT_COUNT_THRESHOLD = 10000
+
+
+def estimate_row_count(model, using="default"):
+    """
+    Return the planner's row estimate for a table, or None if there is none
+    - PostgreSQL: pg_class.reltuples
+    - SQLite: MAX(rowid), an index lookup that overestimates after deletes
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [table],
+                )
+            elif connection.vendor == "sqlite":
+                cursor.execute(
+                    f"SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}"
+                )
+            elif connection.vendor == "mysql":
+                cursor.execute(
+                    "SELECT table_rows FROM information_schema.tables "
+                    "WHERE table_schema = DATABASE() AND table_name = %s",
+                    [table],
+                )
+            else:
+                return None
+            row = cursor.fetchone()
+    except Exception as e:
+        logger.error(f"Error estimating row count of {table}=> {e}", exc_info=True)
+        return None
+
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator for admin changelists on big tables
+    - An unfiltered queryset uses the table estimate instead of COUNT(*)
+    - Filtered querysets and small tables still get an exact count
+    """
+
+    @cached_property
+    def count(self):
+        object_list = self.object_list
+
+        if isinstance(object_list, QuerySet) and not object_list.query.where:
+            estimate = estimate_row_count(object_list.model, object_list.db)
+            if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+                return estimate
+
+        return super().count
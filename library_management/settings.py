@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -30,15 +31,23 @@ ALLOWED_HOSTS = []
 
 # Application definition
 
+# Optional apps, both on by default. The production profile
+# (settings_production) turns them off unless asked for, so workers don't
+# import them at boot
+
+ENABLE_SILK = os.environ.get('ENABLE_SILK', '1') == '1'
+
+ENABLE_ADMIN = os.environ.get('ENABLE_ADMIN', '1') == '1'
+
 INSTALLED_APPS = [
     'rest_framework',
     'rest_framework_simplejwt',
-    'silk',
     'django_filters',
     'user.apps.UserConfig',
     'library.apps.LibraryConfig',
     'borrowing.apps.BorrowingConfig',
-    'django.contrib.admin',
+    'taskqueue.apps.TaskqueueConfig',
+    'reporting.apps.ReportingConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -48,15 +57,28 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'library_management.middleware.LoadSheddingMiddleware',
+    'library_management.middleware.APISessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'library_management.middleware.APIAuthenticationMiddleware',
+    'library_management.middleware.APIMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'silk.middleware.SilkyMiddleware',
+    'library_management.middleware.MetricsMiddleware',
 ]
 
+if ENABLE_SILK:
+    INSTALLED_APPS.insert(2, 'silk')
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('library_management.middleware.MetricsMiddleware'),
+        'silk.middleware.SilkyMiddleware',
+    )
+
+if ENABLE_ADMIN:
+    INSTALLED_APPS.insert(
+        INSTALLED_APPS.index('django.contrib.auth'), 'django.contrib.admin'
+    )
+
 ROOT_URLCONF = 'library_management.urls'
 
 TEMPLATES = [
@@ -80,13 +102,76 @@ WSGI_APPLICATION = 'library_management.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# IMMEDIATE transactions take SQLite's write lock up front, so two writers
+# wait on the busy timeout instead of failing with a lock upgrade deadlock
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Borrow and return run again on deadlocks and serialization failures, waiting
+# a random time up to DB_CONFLICT_BACKOFF * 2 ** attempt seconds. SQLite lock
+# timeouts are not retried, the busy timeout above already waited for the lock
+
+DB_CONFLICT_RETRIES = 5
+
+DB_CONFLICT_BACKOFF = 0.05
+
+# Database circuit breaker (LoadSheddingMiddleware)
+# The breaker opens when at least DB_BREAKER_FAILURE_RATE of the last
+# DB_BREAKER_WINDOW queries (and no fewer than DB_BREAKER_MIN_CALLS) failed
+# or took DB_BREAKER_SLOW_QUERY seconds or more. While it is open, writes
+# get 503 with Retry-After and book list/retrieve are served from a copy up to
+# STALE_CACHE_TTL seconds old, refreshed every STALE_CACHE_REFRESH seconds
+
+DB_BREAKER_WINDOW = 50
+
+DB_BREAKER_MIN_CALLS = 10
+
+DB_BREAKER_FAILURE_RATE = 0.5
+
+DB_BREAKER_SLOW_QUERY = 2
+
+DB_BREAKER_OPEN_SECONDS = 10
+
+STALE_CACHE_TTL = 60 * 60
+
+STALE_CACHE_REFRESH = 30
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Use a shared backend (Redis/Memcached) when running several workers so
+# that invalidation reaches every process
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+USER_SUMMARY_CACHE_TTL = 60 * 5
+
+
+# Metrics exposed at /metrics
+# Set METRICS_MULTIPROCESS_DIR when running several worker processes so the
+# scrape adds up every worker (a local directory, dead workers are found by
+# pid), and METRICS_TOKEN to require a bearer token (required by
+# settings_production)
+
+METRICS_MULTIPROCESS_DIR = os.environ.get('METRICS_MULTIPROCESS_DIR')
+
+METRICS_FLUSH_INTERVAL = 5
+
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,7 +219,99 @@ AUTH_USER_MODEL = "user.CustomUser"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'user.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-    ]
-}
\ No newline at end of file
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'library_management.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Idempotency-Key support for borrow and return
+# Stored responses are replayed for IDEMPOTENCY_KEY_TTL seconds,
+# an unfinished request holds its key for IDEMPOTENCY_LOCK_TIMEOUT seconds
+
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Returned borrows older than this many days are moved to BorrowArchive
+# by the archive_borrows command
+
+BORROW_ARCHIVE_AFTER_DAYS = 365
+
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'user.serializers.TokenObtainPairWithClaimsSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'user.serializers.TokenRefreshWithClaimsSerializer',
+}
+
+# Verified access tokens kept in memory per process
+JWT_TOKEN_CACHE_SIZE = 10000
+
+# Put username, is_staff and penalty_points in the tokens and build request.user
+# from them without a database query. Login and token refresh read the claims
+# from the database, so they are only as fresh as the last of the two, and
+# demoted or deactivated users keep their access until the access token expires
+
+JWT_STATELESS_ACCESS_TOKENS = os.environ.get('JWT_STATELESS_ACCESS_TOKENS') == '1'
+
+# Due date reminders sent by the send_due_reminders command
+# NOTIFICATION_BACKEND is one of borrowing.notifications.EmailNotificationBackend
+# (Django's EMAIL_BACKEND), ConsoleNotificationBackend or FileNotificationBackend
+
+NOTIFICATION_BACKEND = os.environ.get(
+    'NOTIFICATION_BACKEND', 'borrowing.notifications.EmailNotificationBackend'
+)
+
+NOTIFICATION_FILE_PATH = BASE_DIR / 'notifications.jsonl'
+
+NOTIFICATION_WORKERS = 4
+
+NOTIFICATION_RATE_LIMIT = 10
+
+DUE_REMINDER_DAYS = 3
+
+# Background tasks, run by the run_task_worker command
+# A failed task is retried after TASK_QUEUE_BACKOFF seconds, doubling every
+# attempt, and is marked dead after TASK_QUEUE_MAX_ATTEMPTS. A running task
+# is handed to another worker once TASK_QUEUE_LOCK_TIMEOUT seconds pass.
+# TASK_QUEUE_EAGER=1 runs tasks in process right after the commit instead
+
+TASK_QUEUE_MAX_ATTEMPTS = 5
+
+TASK_QUEUE_BACKOFF = 2
+
+TASK_QUEUE_LOCK_TIMEOUT = 300
+
+TASK_QUEUE_EAGER = os.environ.get('TASK_QUEUE_EAGER') == '1'
+
+# Circulation report rollups are rebuilt this many days per transaction
+# by the build_reports command
+
+REPORT_BUILD_WINDOW_DAYS = 31
+
+# How borrowing tracks copies: "counter" decrements Book.available_copies,
+# "copies" claims a free BookCopy row so borrowers of one title don't queue on
+# its Book row; available_copies is then refreshed by reconcile_inventory
+
+INVENTORY_MODE = os.environ.get('INVENTORY_MODE', 'counter')
+
+# Response compression (CompressionMiddleware, on in settings_production)
+# Smaller responses are sent uncompressed, brotli is used when installed
+
+COMPRESSION_MIN_SIZE = 1024
+
+COMPRESSION_BROTLI_QUALITY = 4
+
+# Co-borrow recommendations built by the build_recommendations command
+# Readers with more than RECOMMENDATION_MAX_BASKET borrowed books are left
+# out, and pairs borrowed together by fewer than RECOMMENDATION_MIN_SCORE
+# readers are not recommended
+
+RECOMMENDATION_TOP_K = 10
+
+RECOMMENDATION_MAX_BASKET = 200
+
+RECOMMENDATION_MIN_SCORE = 2
@@ -0,0 +1,58 @@
+"""
+Slim production profile for library_management
+
+Loads the development settings, then switches off debug and, unless
+ENABLE_SILK=1 / ENABLE_ADMIN=1 are set, the Silk profiler and the admin site.
+DJANGO_SECRET_KEY must be set, there is no fallback to the development key,
+and so must METRICS_TOKEN, /metrics is public without it, and REDIS_URL for the
+cache shared by all workers.
+Responses are JSON only (no browsable API) and compressed.
+
+Use it with DJANGO_SETTINGS_MODULE=library_management.settings_production
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+os.environ.setdefault('ENABLE_SILK', '0')
+os.environ.setdefault('ENABLE_ADMIN', '0')
+
+from .settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+
+SECRET_KEY = os.environ.get('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Set DJANGO_SECRET_KEY for the production profile')
+
+if not METRICS_TOKEN:  # noqa: F405
+    raise ImproperlyConfigured('Set METRICS_TOKEN for the production profile')
+
+# Borrow and return invalidate the user summary and every worker refreshes the
+# stale book copies, so all workers must share one cache. With the default
+# per process LocMemCache other workers would serve stale summaries
+REDIS_URL = os.environ.get('REDIS_URL')
+if not REDIS_URL:
+    raise ImproperlyConfigured('Set REDIS_URL for the production profile')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+}
+
+ALLOWED_HOSTS = [
+    host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host
+]
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,  # noqa: F405
+    'DEFAULT_RENDERER_CLASSES': ['library_management.renderers.FastJSONRenderer'],
+}
+
+MIDDLEWARE.insert(  # noqa: F405
+    MIDDLEWARE.index('django.middleware.security.SecurityMiddleware') + 1,  # noqa: F405
+    'library_management.middleware.CompressionMiddleware',
+)
@@ -0,0 +1,229 @@
+import gzip
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+
+from library.choices import CategoryChoice
+from library.models import Author, Book, Category
+from user.models import CustomUser
+
+from . import middleware
+from .breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, db_breaker
+from .middleware import CompressionMiddleware, choose_encoding
+from .renderers import FastJSONRenderer
+
+
+@override_settings(
+    DB_BREAKER_WINDOW=4,
+    DB_BREAKER_MIN_CALLS=4,
+    DB_BREAKER_FAILURE_RATE=0.5,
+    DB_BREAKER_SLOW_QUERY=2,
+    DB_BREAKER_OPEN_SECONDS=10,
+)
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 100.0
+        patcher = mock.patch(
+            "library_management.breaker.time.monotonic", side_effect=lambda: self.now
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.breaker = CircuitBreaker()
+
+    def record(self, *outcomes):
+        for failed in outcomes:
+            self.breaker.record(0.01, failed=failed)
+
+    def test_opens_when_half_the_window_fails(self):
+        self.record(False, False, False)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+        self.record(True, True)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+
+    def test_slow_queries_count_as_failures(self):
+        self.record(False, False)
+        self.breaker.record(2, failed=False)
+        self.breaker.record(3, failed=False)
+
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_half_open_then_closed(self):
+        self.record(True, True, True, True)
+        self.now += 4
+        self.assertEqual(self.breaker.retry_after(), 6)
+
+        self.now += 6
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+
+        self.record(False, False, False, False)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_half_open_then_open_again(self):
+        self.record(True, True, True, True)
+        self.now += 10
+        self.assertTrue(self.breaker.allow_request())
+
+        self.record(False, True, False, True)
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.retry_after(), 10)
+
+
+class LoadSheddingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        db_breaker.reset()
+        self.addCleanup(db_breaker.reset)
+        self.user = CustomUser.objects.create_user(username="reader", password="x")
+        self.client.force_authenticate(self.user)
+        author = Author.objects.create(name="Author", bio="")
+        self.category = Category.objects.create(name=CategoryChoice.FICTION)
+        self.book = self.create_book("Novel", author)
+
+    def create_book(self, title, author):
+        return Book.objects.create(
+            title=title,
+            description="",
+            author=author,
+            category=self.category,
+            total_copies=1,
+            available_copies=1,
+        )
+
+    def open_breaker(self):
+        with self.assertLogs("library_management.breaker", "WARNING"):
+            for _ in range(settings.DB_BREAKER_WINDOW):
+                db_breaker.record(0, failed=True)
+        self.assertEqual(db_breaker.state, OPEN)
+
+    def titles(self, response):
+        data = response.data
+        books = data["results"] if isinstance(data, dict) else data
+        return [book["title"] for book in books]
+
+    def test_writes_get_retry_after_while_open(self):
+        self.open_breaker()
+
+        response = self.client.post("/api/borrow/", {"book_id": self.book.pk})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], str(settings.DB_BREAKER_OPEN_SECONDS))
+        self.assertFalse(self.user.borrows.exists())
+
+    def test_book_list_served_stale_while_open(self):
+        response = self.client.get("/api/books/")
+        self.assertEqual(self.titles(response), ["Novel"])
+        self.assertFalse(response.has_header("Stale-Response"))
+
+        self.create_book("Sequel", self.book.author)
+        self.open_breaker()
+        response = self.client.get("/api/books/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Stale-Response"], "true")
+        self.assertEqual(self.titles(response), ["Novel"])
+
+    def test_book_list_without_a_stale_copy(self):
+        self.open_breaker()
+
+        response = self.client.get("/api/books/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Stale-Response"))
+        self.assertEqual(self.titles(response), ["Novel"])
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def assertSameBytes(self, data):
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_same_bytes_as_json_renderer(self):
+        self.assertSameBytes(
+            {
+                "borrowed": datetime(2026, 10, 19, 8, 30, 5, 123456, timezone.utc),
+                "naive": datetime(2026, 10, 19, 8, 30),
+                "due": date(2026, 11, 2),
+                "fine": Decimal("12.50"),
+                "id": uuid.UUID(int=1),
+                "label": gettext_lazy("Fiction"),
+                "counts": {1: 2},
+                "title": "Ein Buch \u2028 über \u2029 Zeilen",
+            }
+        )
+
+    def test_lists_and_empty_values(self):
+        self.assertSameBytes([None, True, 0, 1.5, "", [], {}])
+
+    def test_none(self):
+        self.assertSameBytes(None)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=100)
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = b'{"title": "Novel"}' * 20
+
+    def respond(self, accept_encoding, body=None, content_type="application/json"):
+        response = HttpResponse(body or self.body, content_type=content_type)
+        response["ETag"] = '"abc"'
+        request = RequestFactory().get(
+            "/api/books/", HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_gzip(self):
+        response = self.respond("gzip, deflate")
+
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+
+    def test_refused_or_missing_encoding(self):
+        for accept_encoding in ("", "identity", "gzip;q=0", "br"):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self.respond(accept_encoding)
+
+                self.assertFalse(response.has_header("Content-Encoding"))
+                self.assertEqual(response["Vary"], "Accept-Encoding")
+                self.assertEqual(response.content, self.body)
+
+    def test_below_min_size(self):
+        response = self.respond("gzip", body=b'{"title": "Novel"}')
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertFalse(response.has_header("Vary"))
+
+    def test_not_compressible(self):
+        response = self.respond("gzip", content_type="image/png")
+
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_choose_encoding(self):
+        with mock.patch.object(middleware, "brotli", None):
+            self.assertEqual(choose_encoding("br, gzip"), "gzip")
+            self.assertEqual(choose_encoding("*"), "gzip")
+        with mock.patch.object(middleware, "brotli", mock.Mock()):
+            self.assertEqual(choose_encoding("gzip, br"), "br")
+            self.assertEqual(choose_encoding("gzip, br;q=0"), "gzip")
+
+    @skipUnless(middleware.brotli, "brotli is not installed")
+    def test_brotli(self):
+        response = self.respond("br, gzip")
+
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(middleware.brotli.decompress(response.content), self.body)
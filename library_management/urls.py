@@ -15,13 +15,19 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
+from django.apps import apps
 from django.urls import include, path
 
-from borrowing.views import BorrowView, ReturnBookViewset, UserPenaltyPointsView
+from library_management.views import metrics_view
+from borrowing.views import (
+    BorrowHistoryView,
+    BorrowView,
+    ReturnBookViewset,
+    UserPenaltyPointsView,
+    UserSummaryView,
+)
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
     path("api/login/", include("user.urls.token_urls")),
     path("api/register/", include("user.urls.regi_urls")),
     path("api/user/", include("user.urls.user_urls")),
@@ -29,11 +35,24 @@ urlpatterns = [
     path("api/authors/", include("library.urls.author_urls")),
     path("api/books/", include("library.urls.book_urls")),
     path("api/borrow/", BorrowView.as_view(), name="borrow"),
+    path("api/borrow/history/", BorrowHistoryView.as_view(), name="borrow-history"),
     path("api/return/", ReturnBookViewset.as_view(), name="return-book"),
     path(
         "api/users/<int:id>/penalties",
         UserPenaltyPointsView.as_view(),
         name="penalty-points",
     ),
-    path("silk/", include("silk.urls", namespace="silk")),
+    path("api/me/summary/", UserSummaryView.as_view(), name="user-summary"),
+    path("api/reports/", include("reporting.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
+
+# Optional apps are only imported when they are installed
+
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path("admin/", admin.site.urls))
+
+if apps.is_installed("silk"):
+    urlpatterns.append(path("silk/", include("silk.urls", namespace="silk")))
@@ -0,0 +1,22 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .metrics import registry
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint
+    - If METRICS_TOKEN is set the scraper must send it as a bearer token
+    """
+    token = getattr(settings, "METRICS_TOKEN", None)
+    if token:
+        expected = f"Bearer {token}"
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), expected):
+            return HttpResponse(status=401)
+
+    return HttpResponse(
+        registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_management.settings')
 
 application = get_wsgi_application()
+
+if os.environ.get('WSGI_PRELOAD') == '1':
+    from library_management.preload import warm_application
+
+    warm_application()
@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from reporting.rollups import build_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the circulation report rollups with the borrows made and "
+        "returned since the last build. Run it on a schedule, e.g. hourly"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Rebuild every day from the oldest borrow",
+        )
+        parser.add_argument(
+            "--since",
+            type=date.fromisoformat,
+            help="Rebuild from this day (YYYY-MM-DD), e.g. after editing old borrows",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for start, end, rows in build_rollups(
+            since=options["since"], rebuild=options["rebuild"]
+        ):
+            total += rows
+            self.stdout.write(f"Built {start} to {end}: {rows} rows")
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Rollups up to date, {total} rows written")
+        )
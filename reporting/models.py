@@ -0,0 +1,78 @@
+from django.db import models
+
+from library.models import Category
+from user.models import CustomUser
+
+
+class DailyCategoryStats(models.Model):
+    """
+    Borrows and returns of one category on one day
+    - borrowed counts by borrow date, the return columns by return date
+    """
+
+    day = models.DateField()
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    borrowed = models.PositiveIntegerField(default=0)
+    returned = models.PositiveIntegerField(default=0)
+    returned_late = models.PositiveIntegerField(default=0)
+    days_late = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "category"], name="unique_daily_category_stats"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day}, category id: {self.category_id}"
+
+
+class DailyBorrowerStats(models.Model):
+    """
+    Number of books one user borrowed on one day
+    """
+
+    day = models.DateField()
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name="daily_stats"
+    )
+    borrowed = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "user"], name="unique_daily_borrower_stats"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.day}, user id: {self.user_id}"
+
+
+class DailyOpenStats(models.Model):
+    """
+    Open and overdue borrows as of the last build on that day
+    """
+
+    day = models.DateField(unique=True)
+    open_borrows = models.PositiveIntegerField(default=0)
+    overdue_borrows = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day}, open: {self.open_borrows}"
+
+
+class ReportWatermark(models.Model):
+    """
+    Last day the rollups were built for, the next build starts from it
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    day = models.DateField()
+    built_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} built up to {self.day}"
@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+
+from django.db.models import Sum
+
+from library.snapshot import get_catalog_snapshot
+
+from .models import (
+    DailyBorrowerStats,
+    DailyCategoryStats,
+    DailyOpenStats,
+    ReportWatermark,
+)
+from .rollups import CIRCULATION
+
+DEFAULT_REPORT_DAYS = 30
+MAX_REPORT_DAYS = 366 * 5
+
+
+def report_range(params):
+    """
+    Start and end day from the start/end query params, the last 30 days by default
+    Raises ValueError for bad dates or ranges
+    """
+    try:
+        end = date.fromisoformat(params["end"]) if params.get("end") else date.today()
+        if params.get("start"):
+            start = date.fromisoformat(params["start"])
+        else:
+            start = end - timedelta(days=DEFAULT_REPORT_DAYS - 1)
+    except ValueError:
+        raise ValueError("start and end must be dates as YYYY-MM-DD")
+
+    if start > end:
+        raise ValueError("start must not be after end")
+    if (end - start).days >= MAX_REPORT_DAYS:
+        raise ValueError(f"Reports cover {MAX_REPORT_DAYS} days at most")
+    return start, end
+
+
+def built_as_of():
+    watermark = ReportWatermark.objects.filter(name=CIRCULATION).first()
+    return watermark.built_at if watermark else None
+
+
+def rate(part, whole):
+    return round(part / whole, 4) if whole else 0.0
+
+
+def circulation_by_day(start, end):
+    rows = (
+        DailyCategoryStats.objects.filter(day__range=(start, end))
+        .values("day")
+        .annotate(
+            borrowed=Sum("borrowed"),
+            returned=Sum("returned"),
+            returned_late=Sum("returned_late"),
+        )
+        .order_by("day")
+    )
+    return list(rows)
+
+
+def circulation_by_category(start, end):
+    snapshot = get_catalog_snapshot()
+    rows = (
+        DailyCategoryStats.objects.filter(day__range=(start, end))
+        .values("category_id")
+        .annotate(
+            borrowed=Sum("borrowed"),
+            returned=Sum("returned"),
+            returned_late=Sum("returned_late"),
+        )
+        .order_by("-borrowed")
+    )
+    return [
+        {**row, "category": snapshot.category_name(row["category_id"])} for row in rows
+    ]
+
+
+def overdue_report(start, end):
+    totals = DailyCategoryStats.objects.filter(day__range=(start, end)).aggregate(
+        returned=Sum("returned"),
+        returned_late=Sum("returned_late"),
+        days_late=Sum("days_late"),
+    )
+    returned = totals["returned"] or 0
+    returned_late = totals["returned_late"] or 0
+    days_late = totals["days_late"] or 0
+
+    latest = DailyOpenStats.objects.filter(day__lte=end).order_by("-day").first()
+    return {
+        "returned": returned,
+        "returned_late": returned_late,
+        "late_return_rate": rate(returned_late, returned),
+        "average_days_late": (
+            round(days_late / returned_late, 2) if returned_late else 0.0
+        ),
+        "open_borrows": latest.open_borrows if latest else 0,
+        "overdue_borrows": latest.overdue_borrows if latest else 0,
+        "overdue_rate": (
+            rate(latest.overdue_borrows, latest.open_borrows) if latest else 0.0
+        ),
+        "open_as_of": latest.day if latest else None,
+    }
+
+
+def top_borrowers(start, end, limit=10):
+    rows = (
+        DailyBorrowerStats.objects.filter(day__range=(start, end))
+        .values("user_id", "user__username")
+        .annotate(borrowed=Sum("borrowed"))
+        .order_by("-borrowed", "user_id")[:limit]
+    )
+    return [
+        {
+            "user_id": row["user_id"],
+            "username": row["user__username"],
+            "borrowed": row["borrowed"],
+        }
+        for row in rows
+    ]
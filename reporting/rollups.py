@@ -0,0 +1,168 @@
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from borrowing.models import Borrow, BorrowArchive
+
+from .models import (
+    DailyBorrowerStats,
+    DailyCategoryStats,
+    DailyOpenStats,
+    ReportWatermark,
+)
+
+logger = logging.getLogger(__name__)
+
+CIRCULATION = "circulation"
+
+# Returned borrows live in both tables once the archive job has run
+BORROW_MODELS = [Borrow, BorrowArchive]
+
+
+def first_activity_day():
+    days = [
+        model.objects.aggregate(first=Min("borrow_date"))["first"]
+        for model in BORROW_MODELS
+    ]
+    days = [day for day in days if day is not None]
+    return min(days) if days else date.today()
+
+
+def compute_category_stats(start, end):
+    """
+    Rollup rows per (day, category_id) for the days from start to end
+    - Borrows are counted on their borrow date and returns on their return date,
+      so a borrow only ever changes the rollups of the day it happened on
+    """
+    stats = defaultdict(
+        lambda: {"borrowed": 0, "returned": 0, "returned_late": 0, "days_late": 0}
+    )
+
+    for model in BORROW_MODELS:
+        borrowed = (
+            model.objects.filter(borrow_date__range=(start, end))
+            .values("borrow_date", "book__category_id")
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+        for row in borrowed:
+            key = (row["borrow_date"], row["book__category_id"])
+            stats[key]["borrowed"] += row["total"]
+
+        returned = (
+            model.objects.filter(return_date__range=(start, end))
+            .values_list("return_date", "book__category_id", "due_date")
+            .iterator(chunk_size=5000)
+        )
+        for return_date, category_id, due_date in returned:
+            row = stats[return_date, category_id]
+            row["returned"] += 1
+            if return_date > due_date:
+                row["returned_late"] += 1
+                row["days_late"] += (return_date - due_date).days
+
+    return [
+        DailyCategoryStats(day=day, category_id=category_id, **values)
+        for (day, category_id), values in stats.items()
+    ]
+
+
+def compute_borrower_stats(start, end):
+    stats = defaultdict(int)
+    for model in BORROW_MODELS:
+        rows = (
+            model.objects.filter(borrow_date__range=(start, end))
+            .values("borrow_date", "user_id")
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+        for row in rows:
+            stats[row["borrow_date"], row["user_id"]] += row["total"]
+
+    return [
+        DailyBorrowerStats(day=day, user_id=user_id, borrowed=borrowed)
+        for (day, user_id), borrowed in stats.items()
+    ]
+
+
+@contextmanager
+def snapshot_transaction():
+    """
+    Transaction whose reads all see the same snapshot of the database
+    - SQLite transactions already do, PostgreSQL needs REPEATABLE READ for it,
+      which can only be set as the first statement of the outermost block
+    """
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
+
+
+def build_window(start, end):
+    """
+    Recompute the rollups of the days from start to end and swap them in with
+    one transaction, so readers see either the old or the new numbers of a day
+    - Borrow and BorrowArchive are read in that same transaction, so a borrow
+      the archive job moves meanwhile is counted once, not in both tables
+    """
+    with snapshot_transaction():
+        category_stats = compute_category_stats(start, end)
+        borrower_stats = compute_borrower_stats(start, end)
+
+        DailyCategoryStats.objects.filter(day__range=(start, end)).delete()
+        DailyBorrowerStats.objects.filter(day__range=(start, end)).delete()
+        DailyCategoryStats.objects.bulk_create(category_stats, batch_size=1000)
+        DailyBorrowerStats.objects.bulk_create(borrower_stats, batch_size=1000)
+
+    return len(category_stats) + len(borrower_stats)
+
+
+def build_rollups(since=None, rebuild=False):
+    """
+    Bring the rollups up to date and move the watermark to today
+    - Borrows only change on the day they are made or returned, so only the
+      days from the watermark (the last, partial day built) to today are
+      recomputed; a first run or rebuild starts from the oldest borrow
+    - Long ranges are built in REPORT_BUILD_WINDOW_DAYS windows
+    Yields (start, end, rows) for every window
+    """
+    today = date.today()
+    watermark = ReportWatermark.objects.filter(name=CIRCULATION).first()
+
+    if since is None:
+        if watermark is None or rebuild:
+            since = first_activity_day()
+        else:
+            since = watermark.day
+
+    window = timedelta(days=settings.REPORT_BUILD_WINDOW_DAYS)
+    start = since
+    while start <= today:
+        end = min(start + window - timedelta(days=1), today)
+        try:
+            rows = build_window(start, end)
+        except Exception as e:
+            logger.error(f"Error building rollups {start}..{end}=> {e}", exc_info=True)
+            raise
+        yield start, end, rows
+        start = end + timedelta(days=1)
+
+    open_borrows = Borrow.objects.open()
+    DailyOpenStats.objects.update_or_create(
+        day=today,
+        defaults={
+            "open_borrows": open_borrows.count(),
+            "overdue_borrows": open_borrows.filter(due_date__lt=today).count(),
+        },
+    )
+    ReportWatermark.objects.update_or_create(
+        name=CIRCULATION, defaults={"day": today, "built_at": timezone.now()}
+    )
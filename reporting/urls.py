@@ -0,0 +1,15 @@
+from django.urls import path
+
+from .views import (
+    CategoryCirculationView,
+    DailyCirculationView,
+    OverdueReportView,
+    TopBorrowersView,
+)
+
+urlpatterns = [
+    path("daily/", DailyCirculationView.as_view(), name="report-daily"),
+    path("categories/", CategoryCirculationView.as_view(), name="report-categories"),
+    path("overdue/", OverdueReportView.as_view(), name="report-overdue"),
+    path("top-borrowers/", TopBorrowersView.as_view(), name="report-top-borrowers"),
+]
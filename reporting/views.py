@@ -0,0 +1,107 @@
+import logging
+
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .reports import (
+    built_as_of,
+    circulation_by_category,
+    circulation_by_day,
+    overdue_report,
+    report_range,
+    top_borrowers,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_TOP_BORROWERS = 100
+
+
+class ReportView(APIView):
+    """
+    Base of the circulation report endpoints
+    - Staff only, reads nothing but the rollup tables built by build_reports
+    - ?start=YYYY-MM-DD&end=YYYY-MM-DD, the last 30 days by default
+    - as_of is when the rollups were last built
+    """
+
+    permission_classes = [IsAdminUser]
+    report_name = None
+
+    def report(self, request, start, end):
+        raise NotImplementedError
+
+    def get(self, request):
+        try:
+            start, end = report_range(request.query_params)
+        except ValueError as e:
+            return Response({"details": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            return Response(
+                {
+                    "start": start,
+                    "end": end,
+                    "as_of": built_as_of(),
+                    "results": self.report(request, start, end),
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            logger.error(f"Error in {self.report_name} report=> {e}", exc_info=True)
+            return Response(
+                {
+                    "details": f"An error occure while building the {self.report_name} report"
+                },
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
+class DailyCirculationView(ReportView):
+    """
+    Borrows, returns and late returns per day
+    """
+
+    report_name = "daily circulation"
+
+    def report(self, request, start, end):
+        return circulation_by_day(start, end)
+
+
+class CategoryCirculationView(ReportView):
+    """
+    Borrows, returns and late returns per category, most borrowed first
+    """
+
+    report_name = "category circulation"
+
+    def report(self, request, start, end):
+        return circulation_by_category(start, end)
+
+
+class OverdueReportView(ReportView):
+    """
+    Late return rate over the range and the overdue rate of open borrows
+    """
+
+    report_name = "overdue"
+
+    def report(self, request, start, end):
+        return overdue_report(start, end)
+
+
+class TopBorrowersView(ReportView):
+    """
+    Users who borrowed the most books, ?limit= up to 100 (10 by default)
+    """
+
+    report_name = "top borrowers"
+
+    def report(self, request, start, end):
+        try:
+            limit = int(request.query_params.get("limit", 10))
+        except ValueError:
+            limit = 10
+        return top_borrowers(start, end, limit=min(max(limit, 1), MAX_TOP_BORROWERS))
@@ -0,0 +1,28 @@
+from django.contrib import admin
+
+from library_management.paginators import EstimatedCountPaginator
+
+from .models import Task
+from .worker import requeue_dead
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = [
+        "name",
+        "status",
+        "attempts",
+        "max_attempts",
+        "run_after",
+        "created_at",
+    ]
+    list_filter = ["status", "name"]
+    readonly_fields = ["last_error"]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["requeue"]
+
+    @admin.action(description="Queue selected dead tasks again")
+    def requeue(self, request, queryset):
+        requeued = requeue_dead(queryset)
+        self.message_user(request, f"Queued {requeued} tasks again")
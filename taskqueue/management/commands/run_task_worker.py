@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+
+from taskqueue.worker import claim_tasks, load_tasks, run_task
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks with a pool of threads until stopped"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait before polling again when no task is due",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no task is due instead of polling",
+        )
+
+    def handle(self, *args, **options):
+        load_tasks()
+        threads = options["threads"]
+        counts = {"succeeded": 0, "failed": 0}
+        running = set()
+
+        def collect(done):
+            for future in done:
+                running.discard(future)
+                counts["succeeded" if future.result() else "failed"] += 1
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            try:
+                while True:
+                    tasks = claim_tasks(threads - len(running))
+                    for task in tasks:
+                        running.add(executor.submit(run_task, task))
+
+                    if running:
+                        done, _ = wait(
+                            running,
+                            timeout=options["poll_interval"],
+                            return_when=FIRST_COMPLETED,
+                        )
+                        collect(done)
+                    elif options["once"]:
+                        break
+                    else:
+                        time.sleep(options["poll_interval"])
+            except KeyboardInterrupt:
+                self.stdout.write("Stopping, waiting for running tasks")
+                collect(wait(running).done)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{counts['succeeded']} tasks succeeded, {counts['failed']} failed"
+            )
+        )
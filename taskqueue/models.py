@@ -0,0 +1,38 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class Task(models.Model):
+    """
+    A queued call of a registered task function
+    - Finished tasks are deleted, so the table only holds queued, running
+      and dead (out of attempts) tasks
+    - A running task whose locked_until has passed is claimed again, its
+      worker is assumed dead
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    DEAD = "dead"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DEAD, "Dead")]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    run_after = models.DateTimeField()
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "run_after"], name="task_status_run_after_idx"
+            ),
+        ]
+
+    def __str__(self):
+        return f"task: {self.name}, status: {self.status}"
@@ -0,0 +1,81 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class TaskFunction:
+    """
+    A function that can run in the background worker, made with @task
+    - Calling it directly still runs it inline
+    """
+
+    def __init__(self, func, name, max_attempts):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, args=(), kwargs=None, on_commit=True, delay=0):
+        """
+        Queue a call of the task, arguments must be JSON serializable
+        - on_commit=True writes the task once the current transaction commits
+          and drops it on rollback, keeping the write out of the transaction
+        - on_commit=False writes it as part of the current transaction, so it
+          can never be lost between the commit and the enqueue
+        - With TASK_QUEUE_EAGER the task runs in process after the commit
+        """
+        args = list(args)
+        kwargs = kwargs or {}
+
+        if settings.TASK_QUEUE_EAGER:
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return
+
+        def create():
+            Task.objects.create(
+                name=self.name,
+                args=args,
+                kwargs=kwargs,
+                max_attempts=self.max_attempts,
+                run_after=timezone.now() + timedelta(seconds=delay),
+            )
+
+        if on_commit:
+            transaction.on_commit(create)
+        else:
+            create()
+
+
+def task(func=None, *, name=None, max_attempts=None):
+    """
+    Register a function as a background task
+
+        @task(max_attempts=3)
+        def rebuild_index(book_id): ...
+
+        rebuild_index.enqueue(args=[book.pk])
+    """
+
+    def register(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        task_function = TaskFunction(
+            func, task_name, max_attempts or settings.TASK_QUEUE_MAX_ATTEMPTS
+        )
+        registry[task_name] = task_function
+        return task_function
+
+    if func is not None:
+        return register(func)
+    return register
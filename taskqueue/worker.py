@@ -0,0 +1,113 @@
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+from .queue import registry
+
+logger = logging.getLogger(__name__)
+
+
+def load_tasks():
+    """
+    Import the tasks module of every installed app so @task registers them
+    """
+    autodiscover_modules("tasks")
+
+
+def claimable(now):
+    return Q(status=Task.QUEUED, run_after__lte=now) | Q(
+        status=Task.RUNNING, locked_until__lt=now
+    )
+
+
+def claim_tasks(limit):
+    """
+    Claim up to `limit` due tasks for this worker
+    - Each task is taken with a conditional UPDATE, so two workers polling at
+      the same time never run the same task
+    Returns the claimed tasks
+    """
+    now = timezone.now()
+    candidates = list(
+        Task.objects.filter(claimable(now))
+        .order_by("run_after")
+        .values_list("pk", flat=True)[:limit]
+    )
+
+    locked_until = now + timedelta(seconds=settings.TASK_QUEUE_LOCK_TIMEOUT)
+    claimed = []
+    for pk in candidates:
+        taken = Task.objects.filter(claimable(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_until=locked_until,
+            attempts=F("attempts") + 1,
+        )
+        if taken:
+            claimed.append(pk)
+
+    return list(Task.objects.filter(pk__in=claimed))
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff with jitter, TASK_QUEUE_BACKOFF seconds after the first failure
+    """
+    delay = settings.TASK_QUEUE_BACKOFF * 2 ** (attempts - 1)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def run_task(task):
+    """
+    Run one claimed task
+    - Success deletes the task
+    - Failure queues it again with backoff, or marks it dead once it is out of attempts
+    - Nothing is written if another worker took the task over in the meantime
+    Returns True if the task succeeded
+    """
+    try:
+        task_function = registry.get(task.name)
+        if task_function is None:
+            raise LookupError(f"No task registered as {task.name}")
+
+        task_function.func(*task.args, **task.kwargs)
+    except Exception as e:
+        logger.error(
+            f"Error running task {task.name} (attempt {task.attempts})=> {e}",
+            exc_info=True,
+        )
+        error = traceback.format_exc()
+        if task.attempts >= task.max_attempts:
+            Task.objects.filter(pk=task.pk, attempts=task.attempts).update(
+                status=Task.DEAD, locked_until=None, last_error=error
+            )
+        else:
+            Task.objects.filter(pk=task.pk, attempts=task.attempts).update(
+                status=Task.QUEUED,
+                locked_until=None,
+                last_error=error,
+                run_after=timezone.now()
+                + timedelta(seconds=retry_delay(task.attempts)),
+            )
+        return False
+    else:
+        Task.objects.filter(pk=task.pk, attempts=task.attempts).delete()
+        return True
+    finally:
+        close_old_connections()
+
+
+def requeue_dead(queryset):
+    """
+    Give dead tasks a fresh set of attempts
+    """
+    return queryset.filter(status=Task.DEAD).update(
+        status=Task.QUEUED, attempts=0, run_after=timezone.now()
+    )
@@ -1,4 +1,20 @@
 from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin
+
+from library_management.paginators import EstimatedCountPaginator
+
 from .models import CustomUser
 
-admin.site.register(CustomUser)
+
+@admin.register(CustomUser)
+class CustomUserAdmin(UserAdmin):
+    list_display = ["username", "email", "is_staff", "penalty_points"]
+    fieldsets = UserAdmin.fieldsets + (("Borrowing", {"fields": ["penalty_points"]}),)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ["reset_penalty_points"]
+
+    @admin.action(description="Reset penalty points of selected users")
+    def reset_penalty_points(self, request, queryset):
+        updated = queryset.filter(penalty_points__gt=0).update(penalty_points=0)
+        self.message_user(request, f"Reset penalty points of {updated} users")
@@ -0,0 +1,100 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import CustomUser
+
+STATELESS_CLAIMS = ("username", "is_staff", "penalty_points")
+
+
+class TokenClaimsCache:
+    """
+    Bounded LRU of verified tokens keyed by the SHA-256 of the raw token
+    - An entry is dropped once the token's exp claim has passed
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            token, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token, expires_at):
+        with self._lock:
+            self._entries[key] = (token, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+token_cache = TokenClaimsCache(settings.JWT_TOKEN_CACHE_SIZE)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that verifies each distinct token only once until it expires
+    - With JWT_STATELESS_ACCESS_TOKENS on, access tokens that carry the user claims
+      are turned into a user without a database query
+    """
+
+    def get_validated_token(self, raw_token):
+        key = hashlib.sha256(raw_token).hexdigest()
+
+        token = token_cache.get(key)
+        if token is None:
+            token = super().get_validated_token(raw_token)
+            token_cache.set(key, token, token["exp"])
+
+        return token
+
+    def get_user(self, validated_token):
+        if settings.JWT_STATELESS_ACCESS_TOKENS and all(
+            claim in validated_token for claim in STATELESS_CLAIMS
+        ):
+            return self.get_stateless_user(validated_token)
+
+        return super().get_user(validated_token)
+
+    def get_stateless_user(self, validated_token):
+        """
+        Unsaved CustomUser built from the token claims
+        - Claims are as fresh as the last login or refresh, so write paths must
+          update penalty points with F() expressions rather than save()
+        """
+        user = CustomUser(
+            username=validated_token["username"],
+            is_staff=validated_token["is_staff"],
+            penalty_points=validated_token["penalty_points"],
+            is_active=True,
+        )
+        user_id_field = CustomUser._meta.get_field(api_settings.USER_ID_FIELD)
+        setattr(
+            user,
+            user_id_field.attname,
+            user_id_field.to_python(validated_token[api_settings.USER_ID_CLAIM]),
+        )
+        user._state.adding = False
+        user.from_token_claims = True
+        return user
@@ -0,0 +1,101 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from user.authentication import token_cache
+from user.models import CustomUser
+from user.serializers import TokenObtainPairWithClaimsSerializer
+
+BASELINE_MIDDLEWARE = [
+    "django.middleware.security.SecurityMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.middleware.common.CommonMiddleware",
+    "django.middleware.csrf.CsrfViewMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "django.contrib.messages.middleware.MessageMiddleware",
+    "django.middleware.clickjacking.XFrameOptionsMiddleware",
+]
+
+BASELINE_AUTHENTICATION = [
+    "rest_framework_simplejwt.authentication.JWTAuthentication",
+    "rest_framework.authentication.SessionAuthentication",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure per request authentication overhead of the plain JWT pipeline "
+        "against the cached and stateless ones. Runs in a rolled back transaction"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--path", default="/api/me/summary/")
+
+    def handle(self, *args, **options):
+        optimized_middleware = [
+            name
+            for name in settings.MIDDLEWARE
+            if name in BASELINE_MIDDLEWARE
+            or name.startswith("library_management.middleware.API")
+        ]
+        optimized_authentication = settings.REST_FRAMEWORK[
+            "DEFAULT_AUTHENTICATION_CLASSES"
+        ]
+
+        variants = [
+            ("baseline", BASELINE_MIDDLEWARE, BASELINE_AUTHENTICATION, False),
+            ("cached", optimized_middleware, optimized_authentication, False),
+            (
+                "cached + stateless",
+                optimized_middleware,
+                optimized_authentication,
+                True,
+            ),
+        ]
+
+        with transaction.atomic():
+            user = CustomUser.objects.create_user(
+                username="bench-auth-user", password="x"
+            )
+
+            self.stdout.write(f"{'pipeline':<20} {'us/request':>12}")
+            for name, middleware, authentication, stateless in variants:
+                rest_framework = {
+                    **settings.REST_FRAMEWORK,
+                    "DEFAULT_AUTHENTICATION_CLASSES": authentication,
+                }
+                with override_settings(
+                    MIDDLEWARE=middleware,
+                    REST_FRAMEWORK=rest_framework,
+                    JWT_STATELESS_ACCESS_TOKENS=stateless,
+                ):
+                    token_cache.clear()
+                    if stateless:
+                        token = TokenObtainPairWithClaimsSerializer.get_token(user)
+                    else:
+                        token = RefreshToken.for_user(user)
+                    elapsed = self.measure(str(token.access_token), options)
+
+                self.stdout.write(
+                    f"{name:<20} {elapsed * 1e6 / options['requests']:>12.1f}"
+                )
+
+            transaction.set_rollback(True)
+
+    def measure(self, access_token, options):
+        client = Client(
+            HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {access_token}"
+        )
+        response = client.get(options["path"])
+        if response.status_code != 200:
+            raise RuntimeError(f"{options['path']} returned {response.status_code}")
+
+        started = time.perf_counter()
+        for _ in range(options["requests"]):
+            client.get(options["path"])
+        return time.perf_counter() - started
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.5 on 2026-10-19 13:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("user", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customuser",
+            name="active_borrow_count",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddConstraint(
+            model_name="customuser",
+            constraint=models.CheckConstraint(
+                condition=models.Q(("active_borrow_count__lte", 3)),
+                name="user_active_borrow_limit",
+            ),
+        ),
+    ]
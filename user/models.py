@@ -2,8 +2,20 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
+MAX_ACTIVE_BORROWS = 3
+
+
 class CustomUser(AbstractUser):
     penalty_points = models.IntegerField(default=0)
+    active_borrow_count = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(active_borrow_count__lte=MAX_ACTIVE_BORROWS),
+                name="user_active_borrow_limit",
+            )
+        ]
 
     def __str__(self):
         return self.username
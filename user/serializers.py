@@ -1,5 +1,12 @@
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from .models import CustomUser
+from django.conf import settings
 from django.contrib.auth.hashers import make_password
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -30,4 +37,50 @@ class CustomUserSerializer(serializers.ModelSerializer):
             update_fields.append(attr)
 
         instance.save(update_fields=update_fields)
-        return instance
\ No newline at end of file
+        return instance
+
+
+def add_user_claims(token, user):
+    token["username"] = user.username
+    token["is_staff"] = user.is_staff
+    token["penalty_points"] = user.penalty_points
+    return token
+
+
+class TokenObtainPairWithClaimsSerializer(TokenObtainPairSerializer):
+    """
+    Adds the claims CachedJWTAuthentication needs to skip the user query
+    when JWT_STATELESS_ACCESS_TOKENS is on
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+
+        if settings.JWT_STATELESS_ACCESS_TOKENS:
+            add_user_claims(token, user)
+
+        return token
+
+
+class TokenRefreshWithClaimsSerializer(TokenRefreshSerializer):
+    """
+    Refresh that reloads the user and writes their current claims into the
+    new tokens, instead of copying them from the refresh token
+    - A demoted, penalized or renamed user gets the new values at the next refresh
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        if not settings.JWT_STATELESS_ACCESS_TOKENS:
+            return data
+
+        access = AccessToken(data["access"])
+        user = CustomUser.objects.get(
+            **{api_settings.USER_ID_FIELD: access[api_settings.USER_ID_CLAIM]}
+        )
+        data["access"] = str(add_user_claims(access, user))
+        if "refresh" in data:
+            data["refresh"] = str(add_user_claims(RefreshToken(data["refresh"]), user))
+
+        return data
@@ -1,3 +1,50 @@
-from django.test import TestCase
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .authentication import token_cache
+from .models import CustomUser
+
+
+@override_settings(JWT_STATELESS_ACCESS_TOKENS=True)
+class StatelessTokenTests(APITestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username="librarian", password="secret-password", is_staff=True
+        )
+
+    def login(self):
+        response = self.client.post(
+            "/api/login/",
+            {"username": "librarian", "password": "secret-password"},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_refresh_reloads_claims(self):
+        tokens = self.login()
+        CustomUser.objects.filter(pk=self.user.pk).update(
+            is_staff=False, penalty_points=4
+        )
+
+        response = self.client.post(
+            "/api/login/refresh/", {"refresh": tokens["refresh"]}
+        )
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.data["access"])
+        self.assertFalse(access["is_staff"])
+        self.assertEqual(access["penalty_points"], 4)
+
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get("/api/reports/daily/").status_code, 403)
+
+    def test_refresh_of_deactivated_user(self):
+        tokens = self.login()
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+
+        response = self.client.post(
+            "/api/login/refresh/", {"refresh": tokens["refresh"]}
+        )
+
+        self.assertEqual(response.status_code, 401)